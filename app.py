@@ -2,13 +2,14 @@ import os
 import logging
 import config
 import time
-from flask import Flask, request, render_template, jsonify
+from datetime import datetime
+from flask import Flask, request, render_template, jsonify, Response, stream_with_context
 from werkzeug.utils import secure_filename
 from storage.factory import StorageFactory
 from services.semantic_processor import SemanticProcessor
 from services.document_processor import DocumentProcessor
-from services.graph_service import GraphService
-from services.llama_service import LlamaService
+from services.graph_service import get_graph_service
+from services.llama_service import LlamaService, DOCUMENT_FILTERS
 from routes.journal_routes import journal_routes
 
 # Configure logging
@@ -48,7 +49,7 @@ def init_services():
         # Initialize graph service if environment variables are present
         if all([os.environ.get(var) for var in ['NEO4J_URI', 'NEO4J_USER', 'NEO4J_PASSWORD']]):
             service_start = time.time()
-            graph_service = GraphService()
+            graph_service = get_graph_service()
             services['graph_db'] = graph_service
             logger.info(f"GraphService initialization took {time.time() - service_start:.2f} seconds")
         else:
@@ -120,22 +121,66 @@ def index():
         logger.error(f"Error rendering index page: {str(e)}")
         return "Service temporarily unavailable", 503
 
+def validate_filters(filters):
+    """Return why the document filters are invalid, or None if they are valid"""
+    if not isinstance(filters, dict):
+        return 'Filters must be an object'
+    unknown = set(filters) - set(DOCUMENT_FILTERS)
+    if unknown:
+        return f"Unknown filters: {', '.join(sorted(unknown))}"
+
+    titles = filters.get('titles')
+    if titles is not None and not (isinstance(titles, list)
+                                   and all(isinstance(title, str) for title in titles)):
+        return 'titles must be a list of strings'
+
+    for name in ('since', 'until'):
+        value = filters.get(name)
+        if value is None:
+            continue
+        if not isinstance(value, str):
+            return f'{name} must be an ISO 8601 timestamp'
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            return f'{name} must be an ISO 8601 timestamp'
+    return None
+
+def parse_query_request():
+    """Validate a query request body and return (query, filters, error response)"""
+    data = request.get_json(silent=True) if request.is_json else None
+    if not isinstance(data, dict):
+        return None, None, (jsonify({
+            'error': 'Request must be JSON',
+            'response': 'Sorry, there was an error processing your request.'
+        }), 400)
+
+    query = data.get('query')
+    if not query or not isinstance(query, str):
+        return None, None, (jsonify({
+            'error': 'No query provided',
+            'response': 'Please provide a question to answer.'
+        }), 400)
+
+    # Optional document filters, e.g. {"titles": [...], "since": "2025-01-01"}
+    filters = data.get('filters')
+    if filters is not None:
+        error = validate_filters(filters)
+        if error:
+            return None, None, (jsonify({
+                'error': error,
+                'response': 'Sorry, there was an error processing your request.'
+            }), 400)
+
+    return query, filters, None
+
 @app.route('/query', methods=['POST'])
 def query_knowledge():
     """Handle knowledge graph queries"""
     try:
-        if not request.is_json:
-            return jsonify({
-                'error': 'Request must be JSON',
-                'response': 'Sorry, there was an error processing your request.'
-            }), 400
-
-        query = request.get_json().get('query')
-        if not query:
-            return jsonify({
-                'error': 'No query provided',
-                'response': 'Please provide a question to answer.'
-            }), 400
+        query, filters, error = parse_query_request()
+        if error:
+            return error
 
         # Check if LlamaService is available
         llama_service = app.config.get('llama_service')
@@ -153,7 +198,7 @@ def query_knowledge():
 
         # Process the query
         try:
-            result = llama_service.process_query(query)
+            result = llama_service.process_query(query, filters=filters)
             if not result:
                 logger.error("Empty response from LlamaService")
                 raise ValueError("Empty response from LlamaService")
@@ -184,6 +229,33 @@ def query_knowledge():
             'response': 'An unexpected error occurred. Please try again later.'
         }), 500
 
+@app.route('/query/stream', methods=['POST'])
+def stream_knowledge_query():
+    """Stream the answer to a knowledge graph query as plain text while it is generated"""
+    try:
+        query, filters, error = parse_query_request()
+        if error:
+            return error
+
+        llama_service = app.config.get('llama_service')
+        if not llama_service:
+            logger.error("LlamaService not initialized")
+            return jsonify({
+                'error': 'Service unavailable',
+                'response': 'The knowledge service is currently unavailable. Please check the /health endpoint for service status.'
+            }), 503
+
+        logger.info(f"Streaming query: {query}")
+        return Response(stream_with_context(llama_service.stream_query(query, filters=filters)),
+                        mimetype='text/plain')
+
+    except Exception as e:
+        logger.error(f"Unexpected error in streaming query endpoint: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'Internal server error',
+            'response': 'An unexpected error occurred. Please try again later.'
+        }), 500
+
 @app.route('/upload', methods=['POST'])
 def upload_document():
     """Handle document upload"""
@@ -224,5 +296,21 @@ def upload_document():
         logger.error(f"Error handling document upload: {str(e)}", exc_info=True)
         return jsonify({'error': 'Failed to process document'}), 500
 
+@app.route('/graph')
+def graph_data():
+    """Stream knowledge graph nodes and links for visualization as NDJSON"""
+    try:
+        graph_service = app.config.get('graph_db')
+        if not graph_service:
+            logger.error("Graph database service unavailable")
+            return jsonify({'error': 'Graph database service unavailable'}), 503
+
+        return Response(stream_with_context(graph_service.stream_visualization_data()),
+                        mimetype='application/x-ndjson')
+
+    except Exception as e:
+        logger.error(f"Error streaming graph data: {str(e)}", exc_info=True)
+        return jsonify({'error': 'Failed to fetch graph data'}), 500
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
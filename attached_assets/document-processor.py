@@ -1,98 +1,199 @@
+import os
+import re
+import hashlib
 import logging
 from datetime import datetime
 import spacy
+from spacy.matcher import PhraseMatcher
 import json
-from typing import Dict, List, Any, Optional
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from types import MappingProxyType
+from spacy.tokens import Doc
+from typing import Dict, List, Any, Optional, Tuple
+
+# Number of text chunks spaCy processes per forward pass
+SPACY_BATCH_SIZE = int(os.environ.get("DOC_PROC_SPACY_BATCH", 64))
+
+# Maximum characters per spaCy chunk so parser memory stays bounded on long paragraphs
+SPACY_CHUNK_SIZE = 8000
+
+# Pipeline components never used by the processor, excluded when loading.
+# Sentence boundaries come from the lightweight senter instead of the parser.
+SPACY_EXCLUDED_PIPES = ("parser", "lemmatizer", "attribute_ruler")
+
+# Components shipped disabled with the model that the processor turns on
+SPACY_ENABLED_PIPES = ("senter",)
+
+# Loaded components that neither NER nor sentence recognition depend on
+PARSE_UNUSED_PIPES = ["tagger"]
+
+# Set DOC_PROC_SPACY_NER=0 to drop statistical NER and detect people by pattern instead
+USE_SPACY_NER = os.environ.get("DOC_PROC_SPACY_NER", "1") != "0"
+
+# Capitalised first and last name, used for person detection when NER is off
+PERSON_NAME_PATTERN = re.compile(r'\b[A-Z][a-z]+ [A-Z][a-z]+\b')
+
+# Sentence boundaries for metadata counts, which do not need a spaCy parse
+SENTENCE_BOUNDARY_PATTERN = re.compile(r'(?<=[.!?])\s+')
+
+# Maximum number of documents whose extracted entities are cached
+ENTITY_CACHE_SIZE = 256
+
+# Volleyball domain terminology used for rule-based entity matching
+# These would be enhanced with proper domain terminology
+VOLLEYBALL_TERMS = {
+    'Skill': ['setting', 'passing', 'blocking', 'serving', 'attacking', 'digging'],
+    'Drill': ['pepper', 'queen of the court', 'mini-game', 'scrimmage', 'target practice'],
+    'VisualElement': ['ball tracking', 'peripheral vision', 'trajectory prediction']
+}
+
+# Visual-motor terminology extracted as VisualElement nodes
+VISUAL_TERMS = [
+    'ball tracking', 'peripheral vision', 'trajectory prediction',
+    'opponent reading', 'visual focus', 'depth perception',
+    'target awareness', 'spatial recognition', 'anticipation',
+    'visual scanning', 'court awareness'
+]
+
+# Entity type for each domain term
+DOMAIN_TERM_TYPES = {
+    term: entity_type
+    for entity_type, terms in VOLLEYBALL_TERMS.items()
+    for term in terms
+}
+
+# Relationship inferred when a (source type, target type) pair shares a sentence
+RELATIONSHIP_PATTERNS = {
+    ('Drill', 'Skill'): 'DEVELOPS',
+    ('Skill', 'Skill'): 'REQUIRES',
+    ('Drill', 'VisualElement'): 'FOCUSES_ON'
+}
+
+# Entity and relationship schemas used for validation
+# In production, these would be loaded from schema files
+ENTITY_SCHEMAS = MappingProxyType({
+    "Athlete": {
+        "required": ("name",),
+        "optional": ["skill_level", "position", "visual_strengths", 
+                     "visual_development_areas", "learning_preferences"],
+        "types": {
+            "name": str,
+            "skill_level": str,
+            "position": str,
+            "visual_strengths": str,
+            "visual_development_areas": str,
+            "learning_preferences": str
+        }
+    },
+    "Skill": {
+        "required": ("name",),
+        "optional": ["description", "category", "difficulty", "visualRequirements"],
+        "types": {
+            "name": str,
+            "description": str,
+            "category": str,
+            "difficulty": str,
+            "visualRequirements": str
+        }
+    },
+    "Drill": {
+        "required": ("name",),
+        "optional": ["description", "focus_area", "intensity", "duration", 
+                     "equipment_needed", "visual_elements", "targets"],
+        "types": {
+            "name": str,
+            "description": str,
+            "focus_area": str,
+            "intensity": str,
+            "duration": int,
+            "equipment_needed": str,
+            "visual_elements": str,
+            "targets": str
+        }
+    }
+    # Additional entity schemas would be defined here
+})
+
+RELATIONSHIP_SCHEMAS = MappingProxyType({
+    "DEVELOPS": {
+        "source": frozenset(["Drill"]),
+        "target": frozenset(["Skill"]),
+        "properties": {
+            "required": (),
+            "optional": ["primary", "development_phase", "effectiveness_rating"],
+            "types": {
+                "primary": bool,
+                "development_phase": str,
+                "effectiveness_rating": int
+            }
+        }
+    },
+    "REQUIRES": {
+        "source": frozenset(["Skill"]),
+        "target": frozenset(["Skill"]),
+        "properties": {
+            "required": (),
+            "optional": ["strength", "transfer_effect"],
+            "types": {
+                "strength": int,
+                "transfer_effect": str
+            }
+        }
+    }
+    # Additional relationship schemas would be defined here
+})
+
+# Required fields per entity type for cheap subset checks
+ENTITY_REQUIRED_FIELDS = MappingProxyType({
+    entity_type: frozenset(schema['required'])
+    for entity_type, schema in ENTITY_SCHEMAS.items()
+})
+
+@lru_cache(maxsize=4)
+def _load_spacy(model: str = "en_core_web_sm", disable: tuple = (),
+                exclude: tuple = (), enable: tuple = ()) -> spacy.language.Language:
+    """Load a spaCy pipeline once per process and share it between processors"""
+    nlp = spacy.load(model, disable=list(disable), exclude=list(exclude))
+    for name in enable:
+        nlp.enable_pipe(name)
+    return nlp
 
 class DocumentProcessor:
+    # Shared pool so LlamaIndex ingestion can overlap with Neo4j writes
+    _pool = ThreadPoolExecutor(max_workers=4)
+
     def __init__(self, graph_service, llama_service, semantic_processor=None):
         self.graph_service = graph_service
         self.llama_service = llama_service
         self.semantic_processor = semantic_processor
         self.logger = logging.getLogger(__name__)
-        self.nlp = spacy.load("en_core_web_sm")
+
+        # Extracted entities keyed by SHA-256 of the document content; written from _pool workers
+        self._entity_cache = OrderedDict()
+        self._entity_cache_lock = threading.Lock()
+
+        excluded_pipes = SPACY_EXCLUDED_PIPES if USE_SPACY_NER else SPACY_EXCLUDED_PIPES + ("ner",)
+        self.nlp = _load_spacy("en_core_web_sm", exclude=excluded_pipes,
+                               enable=SPACY_ENABLED_PIPES)
+
+        # Case-insensitive matchers run over already tokenized Docs
+        self._phrase_matcher = self._build_phrase_matcher(DOMAIN_TERM_TYPES)
+        self._visual_matcher = self._build_phrase_matcher(VISUAL_TERMS)
         
         # Schema definitions for validation
-        self.entity_schemas = self._load_entity_schemas()
-        self.relationship_schemas = self._load_relationship_schemas()
-
-    def _load_entity_schemas(self) -> Dict[str, Dict]:
-        """Load entity schemas from configuration"""
-        # In production, these would be loaded from schema files
-        return {
-            "Athlete": {
-                "required": ["name"],
-                "optional": ["skill_level", "position", "visual_strengths", 
-                             "visual_development_areas", "learning_preferences"],
-                "types": {
-                    "name": str,
-                    "skill_level": str,
-                    "position": str,
-                    "visual_strengths": str,
-                    "visual_development_areas": str,
-                    "learning_preferences": str
-                }
-            },
-            "Skill": {
-                "required": ["name"],
-                "optional": ["description", "category", "difficulty", "visualRequirements"],
-                "types": {
-                    "name": str,
-                    "description": str,
-                    "category": str,
-                    "difficulty": str,
-                    "visualRequirements": str
-                }
-            },
-            "Drill": {
-                "required": ["name"],
-                "optional": ["description", "focus_area", "intensity", "duration", 
-                             "equipment_needed", "visual_elements", "targets"],
-                "types": {
-                    "name": str,
-                    "description": str,
-                    "focus_area": str,
-                    "intensity": str,
-                    "duration": int,
-                    "equipment_needed": str,
-                    "visual_elements": str,
-                    "targets": str
-                }
-            }
-            # Additional entity schemas would be defined here
-        }
+        self.entity_schemas = ENTITY_SCHEMAS
+        self.relationship_schemas = RELATIONSHIP_SCHEMAS
+        self._required_fields = ENTITY_REQUIRED_FIELDS
 
-    def _load_relationship_schemas(self) -> Dict[str, Dict]:
-        """Load relationship schemas from configuration"""
-        # In production, these would be loaded from schema files
-        return {
-            "DEVELOPS": {
-                "source": ["Drill"],
-                "target": ["Skill"],
-                "properties": {
-                    "required": [],
-                    "optional": ["primary", "development_phase", "effectiveness_rating"],
-                    "types": {
-                        "primary": bool,
-                        "development_phase": str,
-                        "effectiveness_rating": int
-                    }
-                }
-            },
-            "REQUIRES": {
-                "source": ["Skill"],
-                "target": ["Skill"],
-                "properties": {
-                    "required": [],
-                    "optional": ["strength", "transfer_effect"],
-                    "types": {
-                        "strength": int,
-                        "transfer_effect": str
-                    }
-                }
-            }
-            # Additional relationship schemas would be defined here
-        }
+    def _build_phrase_matcher(self, terms) -> PhraseMatcher:
+        """Build a token-level matcher keyed by each of the given terms"""
+        matcher = PhraseMatcher(self.nlp.vocab, attr="LOWER")
+        for term in terms:
+            matcher.add(term, [self.nlp.make_doc(term)])
+        return matcher
 
     def process_document(self, file) -> Dict:
         """Process uploaded document and store in knowledge graph with semantic analysis"""
@@ -118,34 +219,39 @@ class DocumentProcessor:
                 doc_info['chunks'] = semantic_data.get('chunks')
                 self.logger.info(f"Document processed with {len(semantic_data.get('entities', []))} entities extracted")
             
-            # Process with LlamaIndex
+            # Process with LlamaIndex in the background while the graph is written
             self.logger.info("Processing document with LlamaIndex...")
-            self.llama_service.process_document(file_content)
-            self.logger.info("Document processed successfully with LlamaIndex")
+            llama_future = self._pool.submit(self.llama_service.process_document, file_content)
 
             # Create document node in Neo4j
             self.logger.info("Creating document node in Neo4j...")
-            doc_node = self.graph_service.create_document_node(doc_info)
+            doc_id = self.graph_service.create_document_node(doc_info)
             self.logger.info("Document node created successfully in Neo4j")
 
+            # Parse once and share the Docs between all extractors
+            docs = self._parse_content(file_content)
+
             # Extract and create entity relationships
             self.logger.info("Creating entity relationships...")
-            entities = self._extract_entities(file_content)
-            self._create_entity_nodes(doc_node, entities)
+            entities = self._extract_entities(file_content, docs)
+            self._create_entity_nodes(doc_id, entities)
             self.logger.info(f"Created {len(entities)} entity relationships")
             
             # Extract and create visual element nodes if present
-            visual_elements = self._extract_visual_elements(file_content)
+            visual_elements = self._extract_visual_elements(docs)
             if visual_elements:
-                self._create_visual_element_nodes(doc_node, visual_elements)
+                self._create_visual_element_nodes(doc_id, visual_elements)
                 self.logger.info(f"Created {len(visual_elements)} visual element nodes")
             
             # Extract and create relationships between entities
-            relationships = self._extract_relationships(file_content, entities)
+            relationships = self._extract_relationships(docs, entities)
             if relationships:
                 self._create_relationship_edges(relationships)
                 self.logger.info(f"Created {len(relationships)} relationship edges")
 
+            llama_future.result()
+            self.logger.info("Document processed successfully with LlamaIndex")
+
             return doc_info
 
         except Exception as e:
@@ -158,11 +264,9 @@ class DocumentProcessor:
             # For text files, decode as UTF-8
             return file.read().decode('utf-8')
         elif file.filename.endswith('.csv'):
-            # Process CSV files
-            import pandas as pd
-            content = file.read()
-            df = pd.read_csv(content)
-            return df.to_json(orient='records')
+            # CSV text only feeds NER and term matching, so skip the pandas
+            # round-trip that repeated every column name on every row
+            return file.read().decode('utf-8', errors='replace')
         elif file.filename.endswith(('.pdf', '.doc', '.docx')):
             # For binary files, read as bytes
             content = file.read()
@@ -179,146 +283,197 @@ class DocumentProcessor:
 
     def _extract_metadata(self, content: str) -> Dict:
         """Extract metadata from document content"""
-        doc = self.nlp(content[:5000])  # Process first 5000 chars for efficiency
+        sentences = SENTENCE_BOUNDARY_PATTERN.split(content)
         
         # Basic metadata extraction
         metadata = {
             'word_count': len(content.split()),
             'char_count': len(content),
-            'sentence_count': len(list(doc.sents)),
+            'sentence_count': sum(1 for sentence in sentences if sentence.strip()),
             'created_at': datetime.now().isoformat(),
-            'language': doc.lang_
+            'language': self.nlp.lang
         }
         
         return metadata
 
-    def _extract_entities(self, content: str) -> List[Dict]:
+    def _parse_content(self, content: str) -> List[Doc]:
+        """Run spaCy once over the paragraph chunks of the content"""
+        if not content or not content.strip():
+            return []
+        return list(self.nlp.pipe(self._chunk_text(content),
+                                  batch_size=SPACY_BATCH_SIZE,
+                                  disable=PARSE_UNUSED_PIPES))
+
+    def _extract_entities(self, content: str, docs: Optional[List[Doc]] = None) -> List[Dict]:
         """Extract volleyball-specific entities from content"""
         # This would be enhanced with domain-specific entity extraction
         # For now using a simple approach based on NER and keyword matching
         
-        doc = self.nlp(content)
-        entities = []
-        
-        # Extract named entities
-        for ent in doc.ents:
-            entities.append({
-                'name': ent.text,
-                'type': ent.label_,
-                'source': 'spacy_ner'
-            })
-        
-        # Extract volleyball domain entities using rule-based matching
-        # These would be enhanced with proper domain terminology
-        volleyball_terms = {
-            'Skill': ['setting', 'passing', 'blocking', 'serving', 'attacking', 'digging'],
-            'Drill': ['pepper', 'queen of the court', 'mini-game', 'scrimmage', 'target practice'],
-            'VisualElement': ['ball tracking', 'peripheral vision', 'trajectory prediction']
-        }
-        
-        for entity_type, terms in volleyball_terms.items():
-            for term in terms:
-                if term.lower() in content.lower():
-                    entities.append({
-                        'name': term,
-                        'type': entity_type,
-                        'source': 'domain_terminology'
-                    })
+        # Nothing to parse for empty or whitespace-only content
+        if not content or not content.strip():
+            return []
+
+        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        with self._entity_cache_lock:
+            cached = self._entity_cache.get(content_hash)
+            if cached is not None:
+                self._entity_cache.move_to_end(content_hash)
+                return list(cached)
+
+        # Collect (type, name, source) tuples; dicts are only built for unique entities
+        mentions = []
         
-        return entities
-
-    def _extract_visual_elements(self, content: str) -> List[Dict]:
-        """Extract visual elements specifically from content"""
-        visual_terms = [
-            'ball tracking', 'peripheral vision', 'trajectory prediction',
-            'opponent reading', 'visual focus', 'depth perception',
-            'target awareness', 'spatial recognition', 'anticipation',
-            'visual scanning', 'court awareness'
-        ]
+        # Extract named entities, reusing the caller's parse when available
+        if docs is None:
+            docs = self._parse_content(content)
+        domain_mentions = []
+        for doc in docs:
+            if USE_SPACY_NER:
+                for ent in doc.ents:
+                    mentions.append((ent.label_, ent.text, 'spacy_ner'))
+            else:
+                for match in PERSON_NAME_PATTERN.finditer(doc.text):
+                    mentions.append(('PERSON', match.group(), 'name_pattern'))
+
+            # Extract volleyball domain entities from the same tokenized Doc
+            for match_id, _, _ in self._phrase_matcher(doc):
+                term = self.nlp.vocab.strings[match_id]
+                domain_mentions.append((DOMAIN_TERM_TYPES[term], term, 'domain_terminology'))
+        mentions.extend(domain_mentions)
         
+        entities = self._deduplicate_entities(mentions)
+        with self._entity_cache_lock:
+            self._entity_cache[content_hash] = entities
+            if len(self._entity_cache) > ENTITY_CACHE_SIZE:
+                self._entity_cache.popitem(last=False)
+        return list(entities)
+
+    def _deduplicate_entities(self, mentions: List[Tuple[str, str, str]]) -> List[Dict]:
+        """Build one entity dict per (type, lowercased name) pair, keeping the first mention"""
+        seen = set()
+        unique_entities = []
+        for entity_type, name, source in mentions:
+            key = (entity_type, name.lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            unique_entities.append({
+                'name': name,
+                'type': entity_type,
+                'source': source
+            })
+        return unique_entities
+
+    def _chunk_text(self, content: str) -> List[str]:
+        """Split content into paragraph chunks for batched spaCy processing"""
+        max_length = min(self.nlp.max_length, SPACY_CHUNK_SIZE)
+        chunks = []
+        for paragraph in content.split('\n\n'):
+            paragraph = paragraph.strip()
+            # Split long paragraphs at the last space before the limit so words stay intact
+            while len(paragraph) > max_length:
+                split_at = paragraph.rfind(' ', 0, max_length)
+                if split_at <= 0:
+                    split_at = max_length
+                chunks.append(paragraph[:split_at])
+                paragraph = paragraph[split_at:].lstrip()
+            if paragraph:
+                chunks.append(paragraph)
+        return chunks
+
+    def _extract_visual_elements(self, docs: List[Doc]) -> List[Dict]:
+        """Extract visual elements specifically from parsed content"""
+        found_terms = []
+        for doc in docs:
+            for match_id, _, _ in self._visual_matcher(doc):
+                term = self.nlp.vocab.strings[match_id]
+                if term not in found_terms:
+                    found_terms.append(term)
+
         visual_elements = []
-        for term in visual_terms:
-            if term.lower() in content.lower():
-                visual_elements.append({
-                    'name': term,
-                    'type': 'VisualElement',
-                    'source': 'visual_terminology'
-                })
+        for term in found_terms:
+            visual_elements.append({
+                'name': term,
+                'type': 'VisualElement',
+                'source': 'visual_terminology'
+            })
         
         return visual_elements
     
-    def _extract_relationships(self, content: str, entities: List[Dict]) -> List[Dict]:
+    def _extract_relationships(self, docs: List[Doc], entities: List[Dict]) -> List[Dict]:
         """Extract relationships between entities"""
         # This would be enhanced with proper relationship extraction
         # For now using a simple co-occurrence approach
         
-        # Get unique entity names
-        entity_names = [e['name'].lower() for e in entities]
-        
-        # Define relationship patterns to look for
-        relationship_patterns = [
-            {'source_type': 'Drill', 'relation': 'DEVELOPS', 'target_type': 'Skill'},
-            {'source_type': 'Skill', 'relation': 'REQUIRES', 'target_type': 'Skill'},
-            {'source_type': 'Drill', 'relation': 'FOCUSES_ON', 'target_type': 'VisualElement'}
-        ]
+        # Index entity positions by lowercased name and match all names in one pass
+        entity_indexes = defaultdict(list)
+        for index, entity in enumerate(entities):
+            entity_indexes[entity['name'].lower()].append(index)
+        matcher = self._build_phrase_matcher(entity_indexes)
         
         relationships = []
-        sentences = list(self.nlp(content).sents)
-        
-        for sentence in sentences:
-            sentence_text = sentence.text.lower()
+        for doc in docs:
+            # Group matched entities by the sentence they occur in
+            sentences = {}
+            entities_by_sentence = defaultdict(set)
+            for match_id, start, _ in matcher(doc):
+                sentence = doc[start].sent
+                sentences[sentence.start] = sentence
+                entities_by_sentence[sentence.start].update(
+                    entity_indexes[self.nlp.vocab.strings[match_id]])
             
-            # Look for entity co-occurrences in the same sentence
-            entities_in_sentence = []
-            for entity in entities:
-                if entity['name'].lower() in sentence_text:
-                    entities_in_sentence.append(entity)
-            
-            # If we have at least 2 entities in a sentence, check for relationships
-            if len(entities_in_sentence) >= 2:
+            for sentence_start, indexes in entities_by_sentence.items():
+                # Only sentences with at least 2 entities can hold a relationship
+                if len(indexes) < 2:
+                    continue
+                sentence_text = sentences[sentence_start].text.lower()
+                entities_in_sentence = [entities[i] for i in sorted(indexes)]
                 for i, source_entity in enumerate(entities_in_sentence):
                     for target_entity in entities_in_sentence[i+1:]:
-                        # Check if this pair matches any of our relationship patterns
-                        for pattern in relationship_patterns:
-                            if source_entity['type'] == pattern['source_type'] and \
-                               target_entity['type'] == pattern['target_type']:
-                                relationships.append({
-                                    'source': source_entity['name'],
-                                    'source_type': source_entity['type'],
-                                    'relation': pattern['relation'],
-                                    'target': target_entity['name'],
-                                    'target_type': target_entity['type'],
-                                    'evidence': sentence_text
-                                })
+                        # Check if this pair matches one of our relationship patterns
+                        relation = RELATIONSHIP_PATTERNS.get(
+                            (source_entity['type'], target_entity['type']))
+                        if relation:
+                            relationships.append({
+                                'source': source_entity['name'],
+                                'source_type': source_entity['type'],
+                                'relation': relation,
+                                'target': target_entity['name'],
+                                'target_type': target_entity['type'],
+                                'evidence': sentence_text
+                            })
         
         return relationships
 
-    def _create_entity_nodes(self, doc_node, entities: List[Dict]) -> None:
+    def _create_entity_nodes(self, doc_id, entities: List[Dict]) -> None:
         """Create entity nodes and link them to the document"""
+        rows = []
         for entity in entities:
             # Validate entity against schema
             entity_type = entity.get('type')
             if entity_type in self.entity_schemas:
-                schema = self.entity_schemas[entity_type]
-                
                 # Check required fields
-                if all(field in entity for field in schema['required']):
-                    # Create the entity and relationship to document
-                    self.graph_service.create_entity_node(entity, doc_node)
+                if self._required_fields[entity_type].issubset(entity.keys()):
+                    rows.append(entity)
                 else:
                     self.logger.warning(f"Entity {entity['name']} missing required fields")
             else:
                 # If no schema exists, create anyway but log warning
                 self.logger.warning(f"No schema for entity type: {entity_type}")
-                self.graph_service.create_entity_node(entity, doc_node)
+                rows.append(entity)
 
-    def _create_visual_element_nodes(self, doc_node, visual_elements: List[Dict]) -> None:
+        # Create the entities and relationships to the document in one batch
+        if rows:
+            self.graph_service.create_entity_nodes_bulk(rows, doc_id)
+
+    def _create_visual_element_nodes(self, doc_id, visual_elements: List[Dict]) -> None:
         """Create visual element nodes and link them to the document"""
-        for element in visual_elements:
-            self.graph_service.create_visual_element_node(element, doc_node)
+        # The set of visual terms is small, so a single batch covers every element
+        self.graph_service.create_visual_element_nodes_bulk(visual_elements, doc_id)
 
     def _create_relationship_edges(self, relationships: List[Dict]) -> None:
         """Create relationship edges between entities"""
+        valid_relationships = []
         for rel in relationships:
             # Validate relationship against schema
             rel_type = rel.get('relation')
@@ -327,25 +482,23 @@ class DocumentProcessor:
                 
                 # Check if source and target types are valid for this relationship
                 if rel['source_type'] in schema['source'] and rel['target_type'] in schema['target']:
-                    # Create the relationship
-                    self.graph_service.create_relationship(
-                        source_name=rel['source'],
-                        source_type=rel['source_type'],
-                        target_name=rel['target'],
-                        target_type=rel['target_type'],
-                        rel_type=rel_type,
-                        properties={'evidence': rel.get('evidence')}
-                    )
+                    valid_relationships.append(rel)
                 else:
                     self.logger.warning(f"Invalid source/target types for relationship: {rel}")
             else:
                 # If no schema exists, create anyway but log warning
                 self.logger.warning(f"No schema for relationship type: {rel_type}")
-                self.graph_service.create_relationship(
-                    source_name=rel['source'],
-                    source_type=rel['source_type'],
-                    target_name=rel['target'],
-                    target_type=rel['target_type'],
-                    rel_type=rel_type,
-                    properties={'evidence': rel.get('evidence')}
-                )
+                valid_relationships.append(rel)
+
+        # Create the relationships with one batched write per relationship type
+        rows_by_type = {}
+        for rel in valid_relationships:
+            rows_by_type.setdefault(rel['relation'], []).append({
+                'sn': rel['source'],
+                'st': rel['source_type'],
+                'tn': rel['target'],
+                'tt': rel['target_type'],
+                'props': {'evidence': rel.get('evidence')}
+            })
+        for rel_type, rows in rows_by_type.items():
+            self.graph_service.create_relationships_batch(rows, rel_type)
@@ -7,12 +7,93 @@ from llama_index.core.tools import QueryEngineTool, ToolMetadata
 import logging
 from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
 from urllib.parse import urlparse
-from py2neo import Graph, ConnectionProfile, Node, Relationship
+from services.graph_service import get_graph_service
+from services.llama_service import _fulltext_search
 from anthropic import Anthropic
 import json
 from datetime import datetime
+from functools import cached_property
 from typing import Dict, List, Any, Optional, Tuple
 
+# Content, entity and visual element matches in a single statement; each branch
+# returns its own row shape as a map, tagged with the branch it came from.
+# Documents found by both document branches are merged, keeping the most relevant row,
+# and the rows come back ordered by relevance so the context order is stable.
+KNOWLEDGE_GRAPH_QUERY = """
+CALL {
+    // 1. Match documents through the title and content full-text index
+    UNWIND CASE WHEN $search = '' THEN [] ELSE [$search] END AS search
+    CALL db.index.fulltext.queryNodes('document_text_ft', search) YIELD node AS d
+    MATCH (d)-[r:CONTAINS]->(e:Entity)
+    WITH d.content as content,
+         d.title as title,
+         collect(distinct e.name) as entities,
+         count(e) as relevance
+    ORDER BY relevance DESC
+    LIMIT 5
+    RETURN 'content' as source,
+           {content: content, title: title, entities: entities, relevance: relevance} as row
+    UNION ALL
+    // 2. Match entities through the name full-text index
+    UNWIND CASE WHEN $search = '' THEN [] ELSE [$search] END AS search
+    CALL db.index.fulltext.queryNodes('entity_name_ft', search) YIELD node AS e
+    MATCH (d:Document)-[:CONTAINS]->(e)
+    WITH d.content as content,
+         d.title as title,
+         collect(distinct e.name) as entities
+    LIMIT 5
+    RETURN 'entity' as source,
+           {content: content, title: title, entities: entities} as row
+    UNION ALL
+    // 3. Match visual elements specifically
+    MATCH (v:VisualElement)
+    WHERE v.name_lower CONTAINS $query_lower
+    MATCH (d:Drill)-[r:FOCUSES_ON]->(v)
+    MATCH (d)-[dev:DEVELOPS]->(s:Skill)
+    WITH v.name as visual_element,
+         collect(distinct d.name) as drills,
+         collect(distinct s.name) as related_skills
+    LIMIT 5
+    RETURN 'visual' as source,
+           {visual_element: visual_element, drills: drills, related_skills: related_skills} as row
+}
+WITH source, row
+ORDER BY coalesce(row.relevance, 0) DESC
+WITH row.title as title, collect({source: source, row: row}) as rows
+UNWIND CASE WHEN title IS NULL THEN rows ELSE rows[0..1] END as best
+RETURN best.source as source, best.row as row
+ORDER BY coalesce(best.row.relevance, 0) DESC, source,
+         coalesce(best.row.title, best.row.visual_element)
+"""
+
+# Drills that develop a skill, with the visual elements they focus on
+DRILL_QUERY = """
+MATCH (s:Skill {name: $skill_name})
+MATCH (d:Drill)-[r:DEVELOPS]->(s)
+OPTIONAL MATCH (d)-[:FOCUSES_ON]->(v:VisualElement)
+RETURN s.name as skill,
+       collect(distinct d.name) as recommended_drills,
+       collect(distinct v.name) as visual_elements,
+       count(d) as relevance
+ORDER BY relevance DESC
+"""
+
+# A few practice plans with their drills
+PRACTICE_PLAN_QUERY = """
+MATCH (p:PracticePlan)
+MATCH (p)-[inc:INCLUDES]->(d:Drill)
+RETURN p.name as practice_plan,
+       p.focus as focus,
+       p.duration as duration,
+       collect(distinct d.name) as drills
+LIMIT 3
+"""
+
+# Schema introspection
+LABELS_QUERY = "CALL db.labels()"
+RELATIONSHIP_TYPES_QUERY = "CALL db.relationshipTypes()"
+PROPERTY_KEYS_QUERY = "CALL db.propertyKeys()"
+
 class LlamaService:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
@@ -30,34 +111,35 @@ class LlamaService:
             self.logger.debug(f"Original URI scheme: {uri.scheme}")
             self.logger.debug(f"Original URI netloc: {uri.netloc}")
 
-            # Initialize direct Neo4j connection for queries
-            profile = ConnectionProfile(
-                scheme="bolt+s" if uri.scheme == 'neo4j+s' else uri.scheme,
-                host=uri.netloc,
-                port=7687,
-                secure=True if uri.scheme == 'neo4j+s' else False,
-                user=NEO4J_USER,
-                password=NEO4J_PASSWORD
-            )
-            self.graph = Graph(profile=profile)
+            # Query through the official driver's pool, sized by NEO4J_POOL_SIZE and
+            # shared with GraphService, so concurrent requests do not queue on one connection
+            self.graph = get_graph_service()
             self.logger.info("Successfully connected to Neo4j database")
 
-            # Initialize graph store
-            self.graph_store = Neo4jGraphStore(
-                username=NEO4J_USER,
-                password=NEO4J_PASSWORD,
-                url=f"bolt+s://{uri.netloc}" if uri.scheme == 'neo4j+s' else NEO4J_URI,
-                database="neo4j"
-            )
-            self.logger.info("Successfully initialized Neo4j graph store")
-            
-            # Set up query engines
-            self._setup_query_engines()
+            # The LlamaIndex graph store and query engines are built on first use
+            self._url = f"bolt+s://{uri.netloc}" if uri.scheme == 'neo4j+s' else NEO4J_URI
 
         except Exception as e:
             self.logger.error(f"Failed to initialize Neo4j connections: {str(e)}")
             raise
 
+    @cached_property
+    def graph_store(self):
+        """LlamaIndex graph store, opened on first use"""
+        graph_store = Neo4jGraphStore(
+            username=NEO4J_USER,
+            password=NEO4J_PASSWORD,
+            url=self._url,
+            database="neo4j"
+        )
+        self.logger.info("Successfully initialized Neo4j graph store")
+        return graph_store
+
+    @cached_property
+    def query_engine_tools(self):
+        """Query engine tools, set up on first use"""
+        return self._setup_query_engines()
+
     def _setup_query_engines(self):
         """Set up different query engines for various RAG strategies"""
         # Set up KG RAG retriever
@@ -74,7 +156,7 @@ class LlamaService:
         )
         
         # Create query engine tools for different scenarios
-        self.query_engine_tools = [
+        return [
             QueryEngineTool(
                 query_engine=self.kg_query_engine,
                 metadata=ToolMetadata(
@@ -227,49 +309,16 @@ class LlamaService:
         results = []
         
         try:
-            # 1. Match content in documents
-            content_query = """
-                MATCH (d:Document)
-                WHERE toLower(d.content) CONTAINS toLower($query)
-                MATCH (d)-[r:CONTAINS]->(e:Entity)
-                RETURN d.content as content, 
-                       d.title as title,
-                       collect(distinct e.name) as entities,
-                       count(e) as relevance
-                ORDER BY relevance DESC
-                LIMIT 5
-            """
-            content_results = self.graph.run(content_query, query=query_text).data()
-            results.extend(content_results)
-            
-            # 2. Match entities by name or properties
-            entity_query = """
-                MATCH (e:Entity)
-                WHERE toLower(e.name) CONTAINS toLower($query)
-                WITH e
-                MATCH (d:Document)-[:CONTAINS]->(e)
-                RETURN d.content as content,
-                       d.title as title,
-                       collect(distinct e.name) as entities
-                LIMIT 5
-            """
-            entity_results = self.graph.run(entity_query, query=query_text).data()
-            results.extend(entity_results)
-            
-            # 3. Match visual elements specifically
-            visual_query = """
-                MATCH (v:VisualElement)
-                WHERE toLower(v.name) CONTAINS toLower($query)
-                MATCH (d:Drill)-[r:FOCUSES_ON]->(v)
-                MATCH (d)-[dev:DEVELOPS]->(s:Skill)
-                RETURN v.name as visual_element,
-                       collect(distinct d.name) as drills,
-                       collect(distinct s.name) as related_skills
-                LIMIT 5
-            """
-            visual_results = self.graph.run(visual_query, query=query_text).data()
-            if visual_results:
-                results.extend(visual_results)
+            # Names are stored lowercased at ingest, so only the query needs lowering
+            query_lower = query_text.lower()
+
+            # Documents and entities are looked up by any query word in the full-text indexes
+            keywords = [word.strip('?.,!') for word in query_lower.split()]
+            search = _fulltext_search(keywords)
+
+            # One round-trip covers the document, entity and visual element matches
+            records = self._run(KNOWLEDGE_GRAPH_QUERY, search=search, query_lower=query_lower)
+            results.extend(record['row'] for record in records)
             
             return results
             
@@ -277,6 +326,10 @@ class LlamaService:
             self.logger.error(f"Error executing knowledge graph queries: {str(e)}")
             return []
 
+    def _run(self, query: str, **params) -> List[Dict]:
+        """Run a read-only Cypher query and return its records as dictionaries"""
+        return self.graph.read_query(query, **params)
+
     def _execute_vector_search(self, query_text: str) -> List[Dict]:
         """Execute vector similarity search"""
         # In a real implementation, this would use vector embeddings
@@ -295,32 +348,13 @@ class LlamaService:
             if skills:
                 for skill in skills:
                     # Find drills that develop this skill
-                    drill_query = """
-                        MATCH (s:Skill {name: $skill_name})
-                        MATCH (d:Drill)-[r:DEVELOPS]->(s)
-                        OPTIONAL MATCH (d)-[:FOCUSES_ON]->(v:VisualElement)
-                        RETURN s.name as skill,
-                               collect(distinct d.name) as recommended_drills,
-                               collect(distinct v.name) as visual_elements,
-                               count(d) as relevance
-                        ORDER BY relevance DESC
-                    """
-                    drill_results = self.graph.run(drill_query, skill_name=skill).data()
+                    drill_results = self._run(DRILL_QUERY, skill_name=skill)
                     if drill_results:
                         results.extend(drill_results)
         
         # Check for practice plan queries
         if any(term in query_text.lower() for term in ["plan", "session", "practice", "workout"]):
-            plan_query = """
-                MATCH (p:PracticePlan)
-                MATCH (p)-[inc:INCLUDES]->(d:Drill)
-                RETURN p.name as practice_plan,
-                       p.focus as focus,
-                       p.duration as duration,
-                       collect(distinct d.name) as drills
-                LIMIT 3
-            """
-            plan_results = self.graph.run(plan_query).data()
+            plan_results = self._run(PRACTICE_PLAN_QUERY)
             if plan_results:
                 results.extend(plan_results)
         
@@ -375,77 +409,70 @@ class LlamaService:
         """Prepare context for AI response from combined results"""
         if not results:
             return None
-            
-        context_sections = []
-        
+
+        # All sections are produced lazily and joined in a single pass
+        return "\n".join(self._context_lines(results))
+
+    @staticmethod
+    def _more(items: List[str], shown: int) -> str:
+        """Describe how many items were left out of a shortened list"""
+        return f" and {len(items) - shown} more" if len(items) > shown else ""
+
+    def _context_lines(self, results: List[Dict]):
+        """Yield the context lines for the combined results, grouped by type"""
         # Group results by type
         skill_results = [r for r in results if 'skill' in r]
-        drill_results = [r for r in results if 'recommended_drills' in r or 'drills' in r]
         visual_results = [r for r in results if 'visual_element' in r or 'visual_elements' in r]
         doc_results = [r for r in results if 'content' in r]
         practice_plan_results = [r for r in results if 'practice_plan' in r]
-        
+
         # Add skill development information
         if skill_results:
-            context_sections.append("## Skill Development Information")
+            yield "## Skill Development Information"
             for result in skill_results:
-                context_sections.append(f"- Skill: {result.get('skill', 'Unknown')}")
+                yield f"- Skill: {result.get('skill', 'Unknown')}"
                 if 'recommended_drills' in result:
                     drills = result['recommended_drills']
-                    context_sections.append(f"  Recommended drills: {', '.join(drills[:3])}" + 
-                                         (f" and {len(drills) - 3} more" if len(drills) > 3 else ""))
-                if 'visual_elements' in result and result['visual_elements']:
-                    context_sections.append(f"  Visual elements: {', '.join(result['visual_elements'])}")
-                context_sections.append("")
-        
+                    yield f"  Recommended drills: {', '.join(drills[:3])}" + self._more(drills, 3)
+                if result.get('visual_elements'):
+                    yield f"  Visual elements: {', '.join(result['visual_elements'])}"
+                yield ""
+
         # Add visual element information
         if visual_results:
-            context_sections.append("## Visual Elements")
+            yield "## Visual Elements"
             for result in visual_results:
                 element = result.get('visual_element', '')
-                if not element and 'visual_elements' in result:
-                    elements = result['visual_elements']
-                    for element in elements:
-                        context_sections.append(f"- Visual Element: {element}")
-                        if 'drills' in result:
-                            context_sections.append(f"  Related drills: {', '.join(result['drills'][:3])}")
-                        if 'related_skills' in result:
-                            context_sections.append(f"  Related skills: {', '.join(result['related_skills'][:3])}")
-                        context_sections.append("")
-                else:
-                    context_sections.append(f"- Visual Element: {element}")
+                elements = result['visual_elements'] if not element and 'visual_elements' in result else [element]
+                for element in elements:
+                    yield f"- Visual Element: {element}"
                     if 'drills' in result:
-                        context_sections.append(f"  Related drills: {', '.join(result['drills'][:3])}")
+                        yield f"  Related drills: {', '.join(result['drills'][:3])}"
                     if 'related_skills' in result:
-                        context_sections.append(f"  Related skills: {', '.join(result['related_skills'][:3])}")
-                    context_sections.append("")
-        
+                        yield f"  Related skills: {', '.join(result['related_skills'][:3])}"
+                    yield ""
+
         # Add practice plan information
         if practice_plan_results:
-            context_sections.append("## Practice Plans")
+            yield "## Practice Plans"
             for result in practice_plan_results:
-                context_sections.append(f"- Practice Plan: {result.get('practice_plan', 'Unknown')}")
-                context_sections.append(f"  Focus: {result.get('focus', 'Not specified')}")
-                context_sections.append(f"  Duration: {result.get('duration', 'Not specified')} minutes")
+                yield f"- Practice Plan: {result.get('practice_plan', 'Unknown')}"
+                yield f"  Focus: {result.get('focus', 'Not specified')}"
+                yield f"  Duration: {result.get('duration', 'Not specified')} minutes"
                 if 'drills' in result:
-                    context_sections.append(f"  Includes drills: {', '.join(result['drills'][:3])}" +
-                                         (f" and {len(result['drills']) - 3} more" if len(result['drills']) > 3 else ""))
-                context_sections.append("")
-        
-        # Add document content excerpts
+                    yield f"  Includes drills: {', '.join(result['drills'][:3])}" + self._more(result['drills'], 3)
+                yield ""
+
+        # Add document content excerpts, the first 200 characters of each
         if doc_results:
-            context_sections.append("## Related Documents")
+            yield "## Related Documents"
             for i, result in enumerate(doc_results[:3]):
-                context_sections.append(f"- Document: {result.get('title', f'Document {i+1}')}")
-                # Get first 200 chars of content as excerpt
-                content = result.get('content', '')
-                excerpt = content[:200] + "..." if len(content) > 200 else content
-                context_sections.append(f"  Excerpt: {excerpt}")
+                yield f"- Document: {result.get('title', f'Document {i+1}')}"
+                content = result.get('content') or ''
+                yield f"  Excerpt: {content[:200] + '...' if len(content) > 200 else content}"
                 if 'entities' in result:
-                    context_sections.append(f"  Related concepts: {', '.join(result['entities'][:5])}")
-                context_sections.append("")
-        
-        return "\n".join(context_sections)
+                    yield f"  Related concepts: {', '.join(result['entities'][:5])}"
+                yield ""
 
     def execute_cypher_query(self, query_text: str, params: Dict = None) -> List[Dict]:
         """Execute a custom Cypher query directly"""
@@ -453,7 +480,8 @@ class LlamaService:
             if params is None:
                 params = {}
                 
-            results = self.graph.run(query_text, **params).data()
+            # Custom queries may write, so they go to the leader
+            results = self.graph.run_query(query_text, **params)
             return results
         except Exception as e:
             self.logger.error(f"Error executing Cypher query: {str(e)}")
@@ -465,29 +493,26 @@ class LlamaService:
         """Retrieve the current schema of the graph database"""
         try:
             # Get node labels
-            label_query = "CALL db.labels()"
-            labels = [record["label"] for record in self.graph.run(label_query).data()]
+            labels = [record["label"] for record in self._run(LABELS_QUERY)]
             
             # Get relationship types
-            rel_query = "CALL db.relationshipTypes()"
-            relationships = [record["relationshipType"] for record in self.graph.run(rel_query).data()]
+            relationships = [record["relationshipType"] for record in self._run(RELATIONSHIP_TYPES_QUERY)]
             
             # Get property keys
-            prop_query = "CALL db.propertyKeys()"
-            properties = [record["propertyKey"] for record in self.graph.run(prop_query).data()]
+            properties = [record["propertyKey"] for record in self._run(PROPERTY_KEYS_QUERY)]
             
             # Get node counts by label
             node_counts = {}
             for label in labels:
                 count_query = f"MATCH (n:{label}) RETURN count(n) as count"
-                count = self.graph.run(count_query).data()[0]["count"]
+                count = self._run(count_query)[0]["count"]
                 node_counts[label] = count
             
             # Get relationship counts by type
             rel_counts = {}
             for rel_type in relationships:
                 count_query = f"MATCH ()-[r:{rel_type}]->() RETURN count(r) as count"
-                count = self.graph.run(count_query).data()[0]["count"]
+                count = self._run(count_query)[0]["count"]
                 rel_counts[rel_type] = count
             
             return {
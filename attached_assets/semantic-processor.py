@@ -6,8 +6,48 @@ from typing import List, Dict, Any, Optional, Tuple
 import logging
 import re
 from datetime import datetime
+from types import MappingProxyType
 import numpy as np
 
+# Visual-motor integration terminology
+VISUAL_TERMS = (
+    "ball tracking", "peripheral vision", "trajectory prediction",
+    "opponent reading", "visual focus", "depth perception",
+    "target awareness", "spatial recognition", "anticipation",
+    "visual scanning", "court awareness", "environmental adaptation",
+    "visual-motor integration"
+)
+
+# Training framework terminology
+FRAMEWORK_TERMS = (
+    "visual-motor integration", "constraint-led approach",
+    "deliberate practice", "periodization", "skill acquisition",
+    "motor learning", "perception-action coupling", "decision training"
+)
+
+# Beach volleyball domain-specific entity patterns, shared by all instances
+DOMAIN_PATTERNS = MappingProxyType({
+    "Skill": (
+        "passing", "setting", "hitting", "attacking", "blocking", "serving", 
+        "defense", "digging", "jump serve", "float serve", "cut shot", "line shot",
+        "pokey", "hand setting", "bump setting", "split blocking", "reading"
+    ),
+    "Drill": (
+        "pepper", "queen of the court", "mini-game", "scrimmage", "wash drill",
+        "target practice", "serve receive", "block touch", "transition drill",
+        "side-out drill", "defensive drill", "passing progression"
+    ),
+    "VisualElement": VISUAL_TERMS,
+    "Framework": (
+        "visual-motor integration", "constraint-led approach",
+        "skill acquisition", "motor learning"
+    ),
+    "Equipment": (
+        "volleyball", "court", "net", "antenna", "targets", "cones",
+        "agility ladder", "platform", "vision goggles", "resistance bands"
+    )
+})
+
 class SemanticProcessor:
     """
     Enhanced semantic processor for beach volleyball knowledge graph.
@@ -25,47 +65,13 @@ class SemanticProcessor:
         self.llm = OpenAI(temperature=0)
         
         # Beach volleyball domain-specific entity patterns
-        self.domain_patterns = self._initialize_domain_patterns()
+        self.domain_patterns = DOMAIN_PATTERNS
         
         # Visual-motor integration terminology
-        self.visual_terms = [
-            "ball tracking", "peripheral vision", "trajectory prediction",
-            "opponent reading", "visual focus", "depth perception",
-            "target awareness", "spatial recognition", "anticipation",
-            "visual scanning", "court awareness", "environmental adaptation",
-            "visual-motor integration"
-        ]
+        self.visual_terms = VISUAL_TERMS
         
         # Training framework terminology
-        self.framework_terms = [
-            "visual-motor integration", "constraint-led approach",
-            "deliberate practice", "periodization", "skill acquisition",
-            "motor learning", "perception-action coupling", "decision training"
-        ]
-
-    def _initialize_domain_patterns(self) -> Dict[str, List[str]]:
-        """Initialize domain-specific entity patterns for beach volleyball"""
-        return {
-            "Skill": [
-                "passing", "setting", "hitting", "attacking", "blocking", "serving", 
-                "defense", "digging", "jump serve", "float serve", "cut shot", "line shot",
-                "pokey", "hand setting", "bump setting", "split blocking", "reading"
-            ],
-            "Drill": [
-                "pepper", "queen of the court", "mini-game", "scrimmage", "wash drill",
-                "target practice", "serve receive", "block touch", "transition drill",
-                "side-out drill", "defensive drill", "passing progression"
-            ],
-            "VisualElement": self.visual_terms,
-            "Framework": [
-                "visual-motor integration", "constraint-led approach",
-                "skill acquisition", "motor learning"
-            ],
-            "Equipment": [
-                "volleyball", "court", "net", "antenna", "targets", "cones",
-                "agility ladder", "platform", "vision goggles", "resistance bands"
-            ]
-        }
+        self.framework_terms = FRAMEWORK_TERMS
 
     def process_document(self, content: str) -> Dict[str, Any]:
         """
@@ -93,10 +99,10 @@ class SemanticProcessor:
         visual_elements = self._extract_visual_elements(content)
         
         # Extract relationships between entities
-        relationships = self._extract_relationships(content, domain_entities + general_entities)
+        relationships = self._extract_relationships(doc, domain_entities + general_entities)
         
-        # Create semantic chunks for embedding
-        chunks = self._create_semantic_chunks(content)
+        # Create semantic chunks for embedding from the same parse
+        chunks = self._create_semantic_chunks(doc)
         
         # Generate embeddings for chunks
         chunk_embeddings = self._generate_chunk_embeddings(chunks)
@@ -185,7 +191,7 @@ class SemanticProcessor:
         
         return visual_elements
 
-    def _extract_relationships(self, content: str, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _extract_relationships(self, doc, entities: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Extract relationships between entities in beach volleyball domain"""
         relationships = []
         
@@ -201,8 +207,8 @@ class SemanticProcessor:
              'patterns': ['informs', 'guides', 'shapes', 'structures', 'underpins']}
         ]
         
-        # Parse document with spaCy
-        doc = self.nlp(content)
+        # Lowercase entity texts once instead of once per sentence
+        entity_texts = [entity['text'].lower() for entity in entities]
         
         # For each sentence, check for co-occurrence of entities and relationship patterns
         for sentence in doc.sents:
@@ -210,8 +216,7 @@ class SemanticProcessor:
             
             # Find entities in this sentence
             entities_in_sentence = []
-            for entity in entities:
-                entity_text = entity['text'].lower()
+            for entity, entity_text in zip(entities, entity_texts):
                 if entity_text in sentence_text:
                     entities_in_sentence.append(entity)
             
@@ -244,23 +249,24 @@ class SemanticProcessor:
         
         return relationships
 
-    def _create_semantic_chunks(self, text: str, chunk_size: int = 512) -> List[str]:
-        """Split text into semantic chunks for embedding generation"""
-        doc = self.nlp(text)
+    def _create_semantic_chunks(self, doc, chunk_size: int = 512) -> List[str]:
+        """Split a parsed document into semantic chunks for embedding generation"""
         chunks = []
         current_chunk = []
         current_length = 0
         
         for sent in doc.sents:
+            sent_text = sent.text
+            
             # If adding this sentence would exceed the chunk size, start a new chunk
-            if current_length + len(sent.text) > chunk_size and current_chunk:
+            if current_length + len(sent_text) > chunk_size and current_chunk:
                 chunks.append(" ".join(current_chunk))
                 current_chunk = []
                 current_length = 0
             
             # Add sentence to current chunk
-            current_chunk.append(sent.text)
-            current_length += len(sent.text)
+            current_chunk.append(sent_text)
+            current_length += len(sent_text)
             
         # Add the last chunk if it's not empty
         if current_chunk:
@@ -304,28 +310,31 @@ class SemanticProcessor:
                 # Simple rule-based classification
                 category_scores = {}
                 
+                # Lowercase the chunk once rather than once per term
+                chunk_lower = chunk.lower()
+                
                 # Check for skill descriptions
-                if any(skill in chunk.lower() for skill in self.domain_patterns["Skill"]):
+                if any(skill in chunk_lower for skill in self.domain_patterns["Skill"]):
                     category_scores["skill_description"] = 0.8
                 
                 # Check for drill explanations
-                if any(drill in chunk.lower() for drill in self.domain_patterns["Drill"]):
+                if any(drill in chunk_lower for drill in self.domain_patterns["Drill"]):
                     category_scores["drill_explanation"] = 0.8
                 
                 # Check for practice plans
-                if "practice plan" in chunk.lower() or "session" in chunk.lower():
+                if "practice plan" in chunk_lower or "session" in chunk_lower:
                     category_scores["practice_plan"] = 0.8
                 
                 # Check for visual training content
-                if any(term in chunk.lower() for term in self.visual_terms):
+                if any(term in chunk_lower for term in self.visual_terms):
                     category_scores["visual_training"] = 0.8
                 
                 # Check for framework explanations
-                if any(term in chunk.lower() for term in self.framework_terms):
+                if any(term in chunk_lower for term in self.framework_terms):
                     category_scores["framework_explanation"] = 0.8
                 
                 # Check for assessment methods
-                if "assessment" in chunk.lower() or "evaluation" in chunk.lower():
+                if "assessment" in chunk_lower or "evaluation" in chunk_lower:
                     category_scores["assessment_method"] = 0.8
                 
                 # If no categories matched, mark as other
@@ -66,6 +66,12 @@ except ValueError as e:
     NEO4J_USER = None
     NEO4J_PASSWORD = None
 
+# Database used for all Neo4j sessions; naming it avoids a home database lookup
+NEO4J_DATABASE = os.environ.get("NEO4J_DATABASE", "neo4j")
+
+# Connections kept in the driver pool shared by graph writes and LLM context queries
+NEO4J_POOL_SIZE = int(os.environ.get("NEO4J_POOL_SIZE", "32"))
+
 # LlamaIndex Configuration
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 logger.debug(f"OpenAI API Key configured: {'Yes' if OPENAI_API_KEY else 'No'}")
\ No newline at end of file
@@ -5,6 +5,40 @@ from typing import Dict, List, Any, Optional
 from anthropic import Anthropic
 from services.semantic_processor import SemanticProcessor
 
+# Characters of document content included in the model context
+CONTENT_PREVIEW_LENGTH = 500
+
+# Main search query over documents, players and skills
+CONTENT_QUERY = """
+MATCH (n)
+WHERE (n:Document AND any(pattern IN $search_patterns 
+      WHERE n.title =~ pattern OR n.content =~ pattern))
+   OR (n:Player AND any(pattern IN $search_patterns 
+      WHERE n.name =~ pattern OR n.description =~ pattern))
+   OR (n:Skill AND any(pattern IN $search_patterns 
+      WHERE n.name =~ pattern))
+WITH n
+OPTIONAL MATCH (n)-[r]->(related)
+RETURN n.title as title,
+       n.content as content,
+       n.name as name,
+       n.description as description,
+       labels(n) as types,
+       collect(distinct type(r)) as relationships,
+       collect(distinct {type: type(r), target: related.name}) as related_nodes
+LIMIT 5
+"""
+
+# Entity relationship query
+ENTITY_QUERY = """
+MATCH (n)-[r]-(m)
+WHERE any(pattern IN $search_patterns WHERE n.name =~ pattern)
+RETURN DISTINCT type(r) as relationship,
+       m.name as related_entity,
+       labels(m) as related_types
+LIMIT 3
+"""
+
 class LlamaService:
     def __init__(self, graph_db=None):
         self.logger = logging.getLogger(__name__)
@@ -12,6 +46,9 @@ class LlamaService:
         self.graph_db = graph_db
         self.semantic_processor = SemanticProcessor()
 
+        # Include raw Cypher in responses only when debugging
+        self.debug = os.getenv("BEACHBOOK_DEBUG") == "1"
+
         if not self.graph_db:
             self.logger.warning("No graph database provided, running in chat-only mode")
 
@@ -30,58 +67,29 @@ class LlamaService:
             # Create case-insensitive pattern for each term
             search_patterns = [f"(?i).*{term}.*" for term in search_terms]
 
-            # Define main search query
-            content_query = """
-            MATCH (n)
-            WHERE (n:Document AND any(pattern IN $search_patterns 
-                  WHERE n.title =~ pattern OR n.content =~ pattern))
-               OR (n:Player AND any(pattern IN $search_patterns 
-                  WHERE n.name =~ pattern OR n.description =~ pattern))
-               OR (n:Skill AND any(pattern IN $search_patterns 
-                  WHERE n.name =~ pattern))
-            WITH n
-            OPTIONAL MATCH (n)-[r]->(related)
-            RETURN n.title as title,
-                   n.content as content,
-                   n.name as name,
-                   n.description as description,
-                   labels(n) as types,
-                   collect(distinct type(r)) as relationships,
-                   collect(distinct {type: type(r), target: related.name}) as related_nodes
-            LIMIT 5
-            """
-
-            # Entity relationship query
-            entity_query = """
-            MATCH (n)-[r]-(m)
-            WHERE any(pattern IN $search_patterns WHERE n.name =~ pattern)
-            RETURN DISTINCT type(r) as relationship,
-                   m.name as related_entity,
-                   labels(m) as related_types
-            LIMIT 3
-            """
-
             # Initialize response structure
+            queries = {
+                'parameters': {
+                    'search_patterns': search_patterns
+                },
+                'query_analysis': {
+                    'input_query': query_text,
+                    'query_type': 'knowledge_search',
+                    'database_state': 'connected' if self.graph_db else 'disconnected',
+                    'analysis_timestamp': datetime.now().isoformat(),
+                    'found_matches': False,
+                    'direct_matches': 0,
+                    'related_matches': 0,
+                    'entities_found': query_entities
+                }
+            }
+            if self.debug:
+                queries['content_query'] = CONTENT_QUERY
+                queries['entity_query'] = ENTITY_QUERY
             response = {
                 'response': None,
                 'technical_details': {
-                    'queries': {
-                        'content_query': content_query,
-                        'entity_query': entity_query,
-                        'parameters': {
-                            'search_patterns': search_patterns
-                        },
-                        'query_analysis': {
-                            'input_query': query_text,
-                            'query_type': 'knowledge_search',
-                            'database_state': 'connected' if self.graph_db else 'disconnected',
-                            'analysis_timestamp': datetime.now().isoformat(),
-                            'found_matches': False,
-                            'direct_matches': 0,
-                            'related_matches': 0,
-                            'entities_found': query_entities
-                        }
-                    }
+                    'queries': queries
                 }
             }
 
@@ -94,14 +102,14 @@ class LlamaService:
                     self.logger.info("Executing knowledge graph query")
 
                     # Execute main content query
-                    results = self.graph_db.query(content_query, {'search_patterns': search_patterns})
+                    results = self.graph_db.query(CONTENT_QUERY, {'search_patterns': search_patterns})
                     self.logger.debug(f"Content query results: {results}")
 
                     if results:
                         self.logger.info(f"Found {len(results)} matches in knowledge graph")
 
                         # Look for related content
-                        related_results = self.graph_db.query(entity_query, {'search_patterns': search_patterns})
+                        related_results = self.graph_db.query(ENTITY_QUERY, {'search_patterns': search_patterns})
                         self.logger.debug(f"Related query results: {related_results}")
 
                         # Prepare context from results
@@ -135,37 +143,37 @@ class LlamaService:
         if not results:
             return None
 
-        context_sections = []
-        for result in results:
-            section = []
-
-            # Handle Document results
-            if 'title' in result:
-                section.append(f"Document: {result['title']}")
-                if 'content' in result and result['content']:
-                    content_preview = result['content'][:500] + "..." if len(result['content']) > 500 else result['content']
-                    section.append(f"Content: {content_preview}")
-
-            # Handle Player/Skill results
-            if 'name' in result:
-                section.append(f"Name: {result['name']}")
-                if 'description' in result and result['description']:
-                    section.append(f"Description: {result['description']}")
-                if 'types' in result:
-                    section.append(f"Type: {', '.join(result['types'])}")
-
-            # Handle relationships
-            if 'relationships' in result and result['relationships']:
-                section.append(f"Relationships: {', '.join(result['relationships'])}")
-            if 'related_nodes' in result and result['related_nodes']:
-                related = [f"{r['target']} ({r['type']})" for r in result['related_nodes'] if r['target']]
-                if related:
-                    section.append(f"Related: {', '.join(related)}")
-
-            if section:
-                context_sections.append("\n".join(section))
-
-        return "\n\n".join(context_sections)
+        # One section per result, built in a single join pass
+        sections = ("\n".join(self._context_lines(result)) for result in results)
+        return "\n\n".join(section for section in sections if section)
+
+    @staticmethod
+    def _context_lines(result: Dict):
+        """Yield the context lines describing a single result"""
+        # Handle Document results
+        if 'title' in result:
+            yield f"Document: {result['title']}"
+            content = result.get('content')
+            if content:
+                if len(content) > CONTENT_PREVIEW_LENGTH:
+                    content = content[:CONTENT_PREVIEW_LENGTH] + "..."
+                yield f"Content: {content}"
+
+        # Handle Player/Skill results
+        if 'name' in result:
+            yield f"Name: {result['name']}"
+            if result.get('description'):
+                yield f"Description: {result['description']}"
+            if 'types' in result:
+                yield f"Type: {', '.join(result['types'])}"
+
+        # Handle relationships
+        if result.get('relationships'):
+            yield f"Relationships: {', '.join(result['relationships'])}"
+        if result.get('related_nodes'):
+            related = ', '.join(f"{r['target']} ({r['type']})" for r in result['related_nodes'] if r['target'])
+            if related:
+                yield f"Related: {related}"
 
     def generate_response(self, query: str, context_info: Optional[str] = None) -> str:
         """Generate a natural language response using Claude"""
@@ -1,6 +1,6 @@
 from datetime import datetime
 import logging
-from services.graph_service import GraphService
+from services.graph_service import get_graph_service
 
 logger = logging.getLogger(__name__)
 
@@ -11,7 +11,7 @@ class JournalEntry:
     def create_audio_entry(audio_path):
         """Create a new audio journal entry"""
         try:
-            graph = GraphService().graph
+            graph = get_graph_service()
 
             # Create journal entry node
             query = """
@@ -24,7 +24,7 @@ class JournalEntry:
             RETURN j, id(j) as id
             """
 
-            result = graph.run(query, audio_path=audio_path).data()
+            result = graph.run_query(query, audio_path=audio_path)
             if result:
                 entry = result[0]['j']
                 entry['id'] = result[0]['id']
@@ -39,7 +39,7 @@ class JournalEntry:
     def create_text_entry(text):
         """Create a new text journal entry"""
         try:
-            graph = GraphService().graph
+            graph = get_graph_service()
 
             # Create journal entry node
             query = """
@@ -52,7 +52,7 @@ class JournalEntry:
             RETURN j, id(j) as id
             """
 
-            result = graph.run(query, text=text).data()
+            result = graph.run_query(query, text=text)
             if result:
                 entry = result[0]['j']
                 entry['id'] = result[0]['id']
@@ -67,7 +67,7 @@ class JournalEntry:
     def get_recent_entries(limit=20):
         """Get recent journal entries"""
         try:
-            graph = GraphService().graph
+            graph = get_graph_service()
 
             query = """
             MATCH (j:JournalEntry)
@@ -80,7 +80,7 @@ class JournalEntry:
             LIMIT $limit
             """
 
-            results = graph.run(query, limit=limit).data()
+            results = graph.read_query(query, limit=limit)
 
             # Format entries for JSON response
             entries = []
@@ -1,12 +1,11 @@
+import codecs
 import logging
+import numpy as np
 from datetime import datetime
-import nltk
 from typing import Dict, List
-from sentence_transformers import SentenceTransformer
 
-# Download required NLTK data
-nltk.download('punkt', quiet=True)
-nltk.download('punkt_tab', quiet=True)
+# Bytes read from an upload per step while decoding it
+UPLOAD_READ_SIZE = 64 * 1024
 
 class DocumentProcessor:
     def __init__(self, graph_service, semantic_processor=None):
@@ -35,22 +34,25 @@ class DocumentProcessor:
             doc_info['stage'] = 'processing'
             doc_info['progress'] = 40
 
-            # Create document node in Neo4j
-            self.logger.info("Creating document node in Neo4j...")
             if not self.graph_service:
                 raise ValueError("Graph service not initialized")
 
-            doc_node = self.graph_service.create_document_node(doc_info)
+            # Analyze before writing so the embedding goes out with the document node
+            semantic_analysis = self.semantic_processor.process_document(file_content)
+
+            # Create document node in Neo4j
+            self.logger.info("Creating document node in Neo4j...")
+            doc_id = self.graph_service.create_document_node(
+                {**doc_info, 'embedding': self._document_embedding(semantic_analysis['embeddings'])})
             self.logger.info("Document node created successfully in Neo4j")
 
             # Update progress
             doc_info['stage'] = 'analyzing'
             doc_info['progress'] = 60
 
-            # Extract and create entity relationships using semantic processor
+            # Create entity relationships from the semantic analysis
             self.logger.info("Creating entity relationships...")
-            semantic_analysis = self.semantic_processor.process_document(file_content)
-            self._create_entity_nodes(doc_node, semantic_analysis['entities'])
+            self._create_entity_nodes(doc_id, semantic_analysis['entities'])
 
             # Final progress update
             doc_info['stage'] = 'complete'
@@ -73,8 +75,17 @@ class DocumentProcessor:
         """Extract content from file based on file type"""
         try:
             if hasattr(file, 'read'):
-                content = file.read()
-                content_str = content.decode('utf-8') if isinstance(content, bytes) else str(content)
+                stream = getattr(file, 'stream', file)
+                if isinstance(stream.read(0), bytes):
+                    # Decode in fixed-size reads instead of holding the raw bytes and the text at once
+                    decoder = codecs.getincrementaldecoder('utf-8')()
+                    parts = []
+                    for block in iter(lambda: stream.read(UPLOAD_READ_SIZE), b''):
+                        parts.append(decoder.decode(block))
+                    parts.append(decoder.decode(b'', final=True))
+                    content_str = ''.join(parts)
+                else:
+                    content_str = str(stream.read())
                 if not content_str.strip():
                     raise ValueError("File is empty")
                 return content_str
@@ -92,21 +103,35 @@ class DocumentProcessor:
             self.logger.error(f"Error extracting file content: {str(e)}")
             raise ValueError(f"Could not read file content: {str(e)}")
 
-    def _create_entity_nodes(self, doc_node, entities: List[Dict]) -> None:
+    @staticmethod
+    def _document_embedding(chunk_embeddings: List[Dict]):
+        """Average the chunk embeddings into a single document embedding"""
+        if not chunk_embeddings:
+            return None
+        return np.mean([chunk['embedding'] for chunk in chunk_embeddings], axis=0).tolist()
+
+    def _create_entity_nodes(self, doc_id, entities: List[Dict]) -> None:
         """Create entity nodes and link them to the document"""
         try:
             if not entities:
                 self.logger.warning("No entities found to create nodes")
                 return
 
+            # Semantic entities use text/label keys; the graph expects name/type.
+            # Repeated mentions of the same entity collapse into a single row.
+            rows = []
+            seen = set()
             for entity in entities:
-                try:
-                    self.graph_service.create_entity_node(entity, doc_node)
-                except Exception as e:
-                    self.logger.error(f"Error creating entity node: {str(e)}")
+                name = entity.get('name', entity.get('text'))
+                entity_type = entity.get('type', entity.get('label'))
+                key = (entity_type, name.lower())
+                if key in seen:
                     continue
+                seen.add(key)
+                rows.append({'name': name, 'type': entity_type})
+            self.graph_service.create_entity_nodes_bulk(rows, doc_id)
 
-            self.logger.info(f"Successfully created {len(entities)} entity nodes")
+            self.logger.info(f"Successfully created {len(rows)} entity nodes")
 
         except Exception as e:
             self.logger.error(f"Error in entity node creation: {str(e)}")
@@ -1,222 +1,648 @@
-import os
-# Store original URI
-original_uri = os.environ.get('NEO4J_URI')
-# Remove NEO4J_URI from environment before importing py2neo
-os.environ.pop('NEO4J_URI', None)
-
-from py2neo import Graph, Node, Relationship, ConnectionProfile
+from neo4j import GraphDatabase, RoutingControl
+from neo4j.exceptions import ClientError
+import atexit
+import json
 import logging
-from urllib.parse import urlparse
-from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
-
-# Restore original URI after py2neo import
-if original_uri:
-    os.environ['NEO4J_URI'] = original_uri
+import threading
+from functools import lru_cache
+from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD, NEO4J_DATABASE, NEO4J_POOL_SIZE
+
+# Connection pool settings for the driver shared by every GraphService
+DRIVER_SETTINGS = {
+    'max_connection_pool_size': NEO4J_POOL_SIZE,
+    'connection_acquisition_timeout': 30,
+    'keep_alive': True,
+    'max_connection_lifetime': 3600
+}
+
+# Entity types that also get their own node label
+ENTITY_LABELS = ['Player', 'Skill', 'Drill', 'VisualElement', 'Partnership']
+
+# Maximum number of rows sent to the database in a single UNWIND query
+UNWIND_BATCH_SIZE = 1000
+
+# Schema constraints and indexes backing the name/type lookups used by MERGE and MATCH
+GRAPH_INDEXES = [
+    "CREATE CONSTRAINT entity_name_type IF NOT EXISTS FOR (e:Entity) REQUIRE (e.name, e.type) IS UNIQUE",
+    "CREATE INDEX entity_name IF NOT EXISTS FOR (n:Entity) ON (n.name)",
+    "CREATE INDEX entity_type IF NOT EXISTS FOR (n:Entity) ON (n.type)",
+    "CREATE INDEX entity_name_lower IF NOT EXISTS FOR (n:Entity) ON (n.name_lower)",
+    "CREATE INDEX document_title IF NOT EXISTS FOR (n:Document) ON (n.title)",
+    "CREATE INDEX visual_element_name IF NOT EXISTS FOR (n:VisualElement) ON (n.name)",
+    "CREATE INDEX visual_element_name_lower IF NOT EXISTS FOR (n:VisualElement) ON (n.name_lower)",
+    "CREATE FULLTEXT INDEX document_text_ft IF NOT EXISTS FOR (n:Document) ON EACH [n.title, n.content]",
+    "CREATE FULLTEXT INDEX entity_name_ft IF NOT EXISTS FOR (n:Entity) ON EACH [n.name]"
+]
+
+# Fill in name_lower on nodes written before it existed; a no-op once every node has it.
+# Runs as auto-commit transactions, which CALL ... IN TRANSACTIONS requires.
+NAME_LOWER_BACKFILLS = [
+    """
+    MATCH (n:Entity) WHERE n.name_lower IS NULL AND n.name IS NOT NULL
+    CALL { WITH n SET n.name_lower = toLower(n.name) } IN TRANSACTIONS OF 10000 ROWS
+    """,
+    """
+    MATCH (n:VisualElement) WHERE n.name_lower IS NULL AND n.name IS NOT NULL
+    CALL { WITH n SET n.name_lower = toLower(n.name) } IN TRANSACTIONS OF 10000 ROWS
+    """
+]
+
+# Size of the sentence-transformers embeddings stored on documents (all-MiniLM-L6-v2)
+EMBEDDING_DIMENSIONS = 384
+
+# Approximate nearest neighbour index over document embeddings
+DOCUMENT_VECTOR_INDEX = f"""
+CREATE VECTOR INDEX document_embedding IF NOT EXISTS
+FOR (n:Document) ON (n.embedding)
+OPTIONS {{indexConfig: {{`vector.dimensions`: {EMBEDDING_DIMENSIONS},
+                        `vector.similarity_function`: 'cosine'}}}}
+"""
+
+# Rows per transaction and worker threads used by apoc.periodic.iterate bulk loads
+BULK_LOAD_BATCH_SIZE = 10000
+BULK_LOAD_CONCURRENCY = 8
+
+# Relationship row counts at or above this go through bulk_load when APOC is installed
+BULK_LOAD_THRESHOLD = 100000
+
+# Run the full-graph visualization scans on the parallel runtime (Neo4j 5.13+ Enterprise/Aura)
+USE_PARALLEL_RUNTIME = True
+PARALLEL_RUNTIME_PREFIX = "CYPHER runtime=parallel "
+
+# Visualization reads, run as two independent streaming queries
+VISUALIZATION_NODE_QUERY = """
+MATCH (n)
+RETURN id(n) AS id, labels(n)[0] AS label,
+       CASE WHEN n:Document THEN n {.title, .timestamp} ELSE properties(n) END AS properties
+"""
+
+VISUALIZATION_LINK_QUERY = """
+MATCH (n)-[r]->(m)
+RETURN id(n) AS source, id(m) AS target, type(r) AS type
+"""
+
+# Document upsert by title, returning only the element id
+MERGE_DOCUMENT_QUERY = """
+MERGE (d:Document {title: $title})
+SET d.content = $content, d.timestamp = $timestamp,
+    d.embedding = coalesce($embedding, d.embedding)
+RETURN elementId(d) AS doc_id
+"""
+
+# Plain entity link without a type label
+LINK_ENTITY_QUERY = """
+MATCH (d:Document) WHERE elementId(d) = $doc_id
+MERGE (e:Entity {name: $name, type: $type})
+SET e.name_lower = toLower($name)
+MERGE (d)-[:CONTAINS]->(e)
+"""
+
+# Player links for partnership entities
+MERGE_PARTNERSHIP_QUERY = """
+MERGE (p1:Player {name: $player1})
+MERGE (p2:Player {name: $player2})
+MERGE (p1)-[r:PARTNERS_WITH]-(p2)
+RETURN r
+"""
+
+MERGE_PARTNERSHIPS_BATCH_QUERY = """
+UNWIND $pairs AS pair
+MERGE (p1:Player {name: pair[0]})
+MERGE (p2:Player {name: pair[1]})
+MERGE (p1)-[:PARTNERS_WITH]-(p2)
+"""
+
+# Visual element upserts by name and type, linked to their document
+CREATE_VISUAL_ELEMENT_QUERY = """
+MATCH (d:Document) WHERE elementId(d) = $doc_id
+MERGE (v:VisualElement {name: $name, type: $type})
+SET v.name_lower = toLower($name)
+MERGE (d)-[:CONTAINS]->(v)
+RETURN elementId(v) AS visual_id
+"""
+
+MERGE_VISUAL_ELEMENTS_BATCH_QUERY = """
+MATCH (d:Document) WHERE elementId(d) = $doc_id
+UNWIND $rows AS row
+MERGE (v:VisualElement {name: row.name, type: row.type})
+SET v.name_lower = toLower(row.name)
+MERGE (d)-[:CONTAINS]->(v)
+"""
+
+# Relationship writes that take the type as a parameter when APOC is installed
+CREATE_RELATIONSHIP_APOC_QUERY = """
+MATCH (s:Entity {name: $source_name, type: $source_type})
+MATCH (t:Entity {name: $target_name, type: $target_type})
+CALL apoc.create.relationship(s, $rel_type, $props, t) YIELD rel
+RETURN count(rel) AS created
+"""
+
+CREATE_RELATIONSHIPS_BATCH_APOC_QUERY = """
+UNWIND $rows AS row
+MATCH (s:Entity {name: row.sn, type: row.st})
+MATCH (t:Entity {name: row.tn, type: row.tt})
+CALL apoc.create.relationship(s, $rel_type, row.props, t) YIELD rel
+RETURN count(rel) AS created
+"""
+
+# Server-side batched load; APOC commits each batch of source rows in its own transaction
+BULK_LOAD_QUERY = """
+CALL apoc.periodic.iterate($source, $operation, {
+    batchSize: $batch_size, parallel: $parallel, concurrency: $concurrency, params: $params
+})
+YIELD committedOperations, failedOperations, errorMessages
+RETURN committedOperations, failedOperations, errorMessages
+"""
+
+# Row source and per-row relationship write used to bulk load relationships
+BULK_RELATIONSHIP_SOURCE = "UNWIND $rows AS row RETURN row"
+
+BULK_RELATIONSHIP_OPERATION = """
+MATCH (s:Entity {name: row.sn, type: row.st})
+MATCH (t:Entity {name: row.tn, type: row.tt})
+CALL apoc.create.relationship(s, $rel_type, row.props, t) YIELD rel
+RETURN count(rel)
+"""
+
+def _quote_rel_type(rel_type):
+    """Quote a relationship type for interpolation into Cypher"""
+    return "`" + rel_type.replace("`", "``") + "`"
+
+@lru_cache(maxsize=64)
+def _create_relationship_query(rel_type):
+    """Build the single relationship write for a type once, for servers without APOC"""
+    return f"""
+    MATCH (s:Entity {{name: $source_name, type: $source_type}})
+    MATCH (t:Entity {{name: $target_name, type: $target_type}})
+    CREATE (s)-[r:{_quote_rel_type(rel_type)}]->(t)
+    SET r += $props
+    RETURN count(r) AS created
+    """
+
+@lru_cache(maxsize=64)
+def _create_relationships_batch_query(rel_type):
+    """Build the batched relationship write for a type once, for servers without APOC"""
+    return f"""
+    UNWIND $rows AS row
+    MATCH (s:Entity {{name: row.sn, type: row.st}})
+    MATCH (t:Entity {{name: row.tn, type: row.tt}})
+    CREATE (s)-[r:{_quote_rel_type(rel_type)}]->(t)
+    SET r += row.props
+    RETURN count(r) AS created
+    """
+
+@lru_cache(maxsize=16)
+def _merge_entity_query(labels):
+    """Build the single entity write for a label set once"""
+    return f"""
+    MATCH (d:Document) WHERE elementId(d) = $doc_id
+    MERGE (e:Entity {{name: $name, type: $type}})
+    ON CREATE SET e.created = timestamp()
+    SET e:{labels}, e.name_lower = toLower($name)
+    MERGE (d)-[:CONTAINS]->(e)
+    RETURN elementId(e) AS entity_id
+    """
+
+@lru_cache(maxsize=16)
+def _merge_entities_batch_query(labels):
+    """Build the batched entity write for a label set once"""
+    return f"""
+    UNWIND $rows AS row
+    MATCH (d:Document) WHERE elementId(d) = row.doc_id
+    MERGE (e:Entity {{name: row.name, type: row.type}})
+    ON CREATE SET e.created = timestamp()
+    SET e:{labels}, e.name_lower = toLower(row.name)
+    MERGE (d)-[:CONTAINS]->(e)
+    """
+
+@lru_cache(maxsize=1)
+def _get_driver(uri, user, password):
+    """Create the pooled Neo4j driver once per process"""
+    return GraphDatabase.driver(uri, auth=(user, password), **DRIVER_SETTINGS)
+
+# Process-wide GraphService handed out by get_graph_service
+_instance = None
+_instance_lock = threading.Lock()
 
 class GraphService:
+    # Bumped after writes so cached reads can tell the graph may have changed
+    _write_epoch = 0
+    _write_epoch_lock = threading.Lock()
+
+    # Set once the shared driver has been verified and the indexes exist
+    _verified = False
+
+    # Whether the document vector index exists and can be queried
+    _vector_index_available = False
+
+    # Whether apoc.create.relationship can be used for parameterized relationship types
+    _apoc_available = False
+
+    # Whether apoc.periodic.iterate can be used for server-side bulk loads
+    _apoc_iterate_available = False
+
+    # Turned off for the process the first time the server rejects the parallel runtime
+    _parallel_runtime = USE_PARALLEL_RUNTIME
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         try:
             if not all([NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD]):
                 raise ValueError("Neo4j credentials not properly configured")
 
-            # Parse the URI and extract hostname for AuraDB
-            uri = urlparse(NEO4J_URI)
-            self.logger.debug(f"Original URI scheme: {uri.scheme}")
-            self.logger.debug(f"Original URI netloc: {uri.netloc}")
-
             try:
-                # Create connection profile
-                if uri.scheme == 'neo4j+s':
-                    # AuraDB connection settings
-                    profile = ConnectionProfile(
-                        scheme="bolt+s",
-                        host=uri.netloc,
-                        port=7687,  # Default AuraDB port
-                        secure=True,
-                        user=NEO4J_USER,
-                        password=NEO4J_PASSWORD
-                    )
-                    self.logger.info("Using AuraDB connection format")
-                else:
-                    profile = ConnectionProfile(
-                        uri=NEO4J_URI,
-                        user=NEO4J_USER,
-                        password=NEO4J_PASSWORD
-                    )
-                    self.logger.info("Using standard Neo4j connection format")
-
-                self.logger.debug(f"Connection profile configured: {profile.scheme}://{profile.host}")
-
-                # Initialize Graph with the connection profile
-                self.graph = Graph(profile=profile)
-
-                # Verify connection
-                result = self.graph.run("RETURN 1 as test").data()
-                self.logger.info("Successfully connected to Neo4j database")
-                self.logger.debug(f"Test query result: {result}")
+                # The driver handles neo4j+s:// (AuraDB) and bolt:// URIs directly
+                # and is shared, so constructing a GraphService reuses its pool
+                self.driver = _get_driver(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+
+                # Verify connection and create indexes once per process
+                if not GraphService._verified:
+                    self.driver.verify_connectivity()
+                    self.logger.info("Successfully connected to Neo4j database")
+
+                    self._ensure_indexes()
+                    apoc_procedures = self._detect_apoc()
+                    GraphService._apoc_available = 'apoc.create.relationship' in apoc_procedures
+                    GraphService._apoc_iterate_available = 'apoc.periodic.iterate' in apoc_procedures
+                    GraphService._verified = True
 
             except Exception as e:
-                self.logger.error(f"Failed to connect to Neo4j: {str(e)}")
+                self.logger.error("Failed to connect to Neo4j: %s", e)
                 raise
 
         except Exception as e:
-            self.logger.error(f"Failed to initialize GraphService: {str(e)}")
+            self.logger.error("Failed to initialize GraphService: %s", e)
             raise
 
+    def _ensure_indexes(self):
+        """Create the schema indexes used by entity and document lookups"""
+        for index_query in GRAPH_INDEXES:
+            try:
+                self.driver.execute_query(index_query, database_=NEO4J_DATABASE)
+            except Exception as e:
+                # Lookups still work without an index, just more slowly
+                self.logger.warning("Could not create index or constraint: %s", e)
+
+        # Lowercase lookups only match nodes that carry name_lower
+        try:
+            with self.driver.session(database=NEO4J_DATABASE) as session:
+                for backfill_query in NAME_LOWER_BACKFILLS:
+                    session.run(backfill_query).consume()
+        except Exception as e:
+            self.logger.warning("Could not backfill name_lower: %s", e)
+
+        # Vector search is skipped entirely on servers without vector indexes
+        try:
+            self.driver.execute_query(DOCUMENT_VECTOR_INDEX, database_=NEO4J_DATABASE)
+            GraphService._vector_index_available = True
+        except Exception as e:
+            self.logger.warning("Could not create the document vector index: %s", e)
+
+    def _detect_apoc(self):
+        """Return which of the APOC procedures used here the server provides"""
+        try:
+            records, _, _ = self.driver.execute_query(
+                "SHOW PROCEDURES YIELD name "
+                "WHERE name IN ['apoc.create.relationship', 'apoc.periodic.iterate'] RETURN name",
+                database_=NEO4J_DATABASE)
+            return {record['name'] for record in records}
+        except Exception as e:
+            self.logger.warning("Could not check for APOC procedures: %s", e)
+            return set()
+
+    @property
+    def vector_index_available(self):
+        """Whether documents can be searched through the vector index"""
+        return GraphService._vector_index_available
+
+    @property
+    def write_epoch(self):
+        """Counter that changes whenever this process may have changed the graph"""
+        return GraphService._write_epoch
+
+    def _bump_write_epoch(self):
+        """Invalidate cached reads after the graph may have changed"""
+        with GraphService._write_epoch_lock:
+            GraphService._write_epoch += 1
+
+    def read_query(self, query, **params):
+        """Run a read-only Cypher query and return its records as dictionaries"""
+        records, _, _ = self.driver.execute_query(query, params, database_=NEO4J_DATABASE,
+                                                  routing_=RoutingControl.READ)
+        return [record.data() for record in records]
+
+    def run_query(self, query, **params):
+        """Run a Cypher query and return its records as dictionaries"""
+        try:
+            records, summary, _ = self.driver.execute_query(query, params, database_=NEO4J_DATABASE)
+        except Exception:
+            # The write may still have committed, so treat the graph as changed
+            self._bump_write_epoch()
+            raise
+
+        # Only queries that changed the graph invalidate cached reads
+        if summary.counters.contains_updates:
+            self._bump_write_epoch()
+        return [record.data() for record in records]
+
+    def _write(self, tx_function, *args):
+        """Run a transaction function in a single managed write transaction"""
+        try:
+            with self.driver.session(database=NEO4J_DATABASE) as session:
+                return session.execute_write(tx_function, *args)
+        finally:
+            self._bump_write_epoch()
+
     def create_document_node(self, doc_info):
-        """Create a node for the document with its metadata"""
-        try:
-            node = Node("Document",
-                       title=doc_info['title'],
-                       content=doc_info['content'],
-                       timestamp=doc_info['timestamp'])
-            self.graph.create(node)
-            return node
+        """Create a node for the document with its metadata and optional embedding"""
+        try:
+            # Re-uploading a document updates the existing node instead of duplicating it
+            # Only the id comes back, not the node and its content
+            # The embedding is written in the same statement rather than a follow-up SET
+            return self._write(lambda tx: tx.run(MERGE_DOCUMENT_QUERY,
+                                                 title=doc_info['title'],
+                                                 content=doc_info['content'],
+                                                 timestamp=doc_info['timestamp'],
+                                                 embedding=doc_info.get('embedding')).single()['doc_id'])
         except Exception as e:
-            self.logger.error(f"Error creating document node: {str(e)}")
+            self.logger.error("Error creating document node: %s", e)
             raise
 
-    def create_entity_relationship(self, doc_node, entity_info):
+    def create_entity_relationship(self, doc_id, entity_info):
         """Create entity nodes and relationships to the document"""
         try:
-            entity_node = Node("Entity",
-                             name=entity_info['name'],
-                             type=entity_info['type'])
-            relationship = Relationship(doc_node, "CONTAINS", entity_node)
-            self.graph.create(relationship)
+            self._write(lambda tx: tx.run(LINK_ENTITY_QUERY,
+                                          doc_id=doc_id,
+                                          name=entity_info['name'],
+                                          type=entity_info['type']).consume())
         except Exception as e:
-            self.logger.error(f"Error creating entity relationship: {str(e)}")
+            self.logger.error("Error creating entity relationship: %s", e)
             raise
 
-    def get_visualization_data(self):
-        """Get graph data in a format suitable for visualization"""
-        try:
-            query = """
-            MATCH (n)-[r]->(m)
-            RETURN collect(distinct {id: id(n), label: labels(n)[0], properties: properties(n)}) as nodes,
-                   collect(distinct {source: id(n), target: id(m), type: type(r)}) as relationships
-            """
-            result = self.graph.run(query).data()[0]
-            return {
-                'nodes': result['nodes'],
-                'links': result['relationships']
-            }
+    def _disable_parallel_runtime(self, error):
+        """Stop requesting the parallel runtime after the server rejects it"""
+        if GraphService._parallel_runtime:
+            GraphService._parallel_runtime = False
+            self.logger.warning("Parallel runtime unavailable, using the default runtime: %s", error)
+
+    def _stream_records(self, session, query):
+        """Run a read query on an open session, falling back from the parallel runtime"""
+        if GraphService._parallel_runtime:
+            try:
+                result = session.run(PARALLEL_RUNTIME_PREFIX + query)
+                # Surface a rejected runtime before any rows are consumed
+                result.peek()
+                return result
+            except ClientError as e:
+                self._disable_parallel_runtime(e)
+        return session.run(query)
+
+    def stream_visualization_data(self):
+        """Yield graph data as NDJSON lines, one node or link per line"""
+        try:
+            with self.driver.session(database=NEO4J_DATABASE,
+                                     default_access_mode="READ") as session:
+                for record in self._stream_records(session, VISUALIZATION_NODE_QUERY):
+                    yield json.dumps({'node': dict(record)}, default=str) + "\n"
+
+                for record in self._stream_records(session, VISUALIZATION_LINK_QUERY):
+                    yield json.dumps({'link': dict(record)}) + "\n"
         except Exception as e:
-            self.logger.error(f"Error fetching graph data: {str(e)}")
+            self.logger.error("Error streaming graph data: %s", e)
             raise
 
-    def create_entity_node(self, entity_info, doc_node):
+    @staticmethod
+    def _create_entity_node_tx(tx, entity_info, doc_id, labels):
+        """Create an entity node, its document link and any partnership edges"""
+        entity_id = tx.run(_merge_entity_query(labels),
+                           doc_id=doc_id,
+                           name=entity_info['name'],
+                           type=entity_info['type']).single()['entity_id']
+
+        # For partnerships, create additional relationships
+        if entity_info['type'] == 'Partnership':
+            player_names = entity_info['name'].split(' and ')
+            if len(player_names) == 2:
+                # Create or find both players and link them
+                tx.run(MERGE_PARTNERSHIP_QUERY,
+                       player1=player_names[0],
+                       player2=player_names[1]).consume()
+
+        return entity_id
+
+    def create_entity_node(self, entity_info, doc_id):
         """Create an entity node and link it to the document"""
         try:
             # Create entity node with the specific label based on type
             labels = ["Entity"]  # Base label
-            if entity_info['type'] in ['Player', 'Skill', 'Drill', 'VisualElement', 'Partnership']:
+            if entity_info['type'] in ENTITY_LABELS:
                 labels.append(entity_info['type'])
 
-            entity_node = Node(*labels,
-                             name=entity_info['name'],
-                             type=entity_info['type'])
+            # Merge the node, relationship and partnerships in a single transaction
+            entity_id = self._write(self._create_entity_node_tx,
+                                      entity_info, doc_id, ":".join(labels))
 
-            # Create relationship between document and entity
-            relationship = Relationship(doc_node, "CONTAINS", entity_node)
+            self.logger.info("Created entity node: %s (%s)", entity_info['name'], entity_info['type'])
+            return entity_id
 
-            # Create both node and relationship in a single transaction
-            self.graph.create(relationship)
+        except Exception as e:
+            self.logger.error("Error creating entity node: %s", e)
+            raise
 
-            # For partnerships, create additional relationships
-            if entity_info['type'] == 'Partnership':
+    @staticmethod
+    def _group_entity_rows(entities, doc_id, rows_by_label, partner_pairs):
+        """Add entity rows for a document to the per-label rows and partnership pairs"""
+        for entity_info in entities:
+            entity_type = entity_info['type']
+            label = entity_type if entity_type in ENTITY_LABELS else None
+            rows_by_label.setdefault(label, []).append({
+                'doc_id': doc_id,
+                'name': entity_info['name'],
+                'type': entity_type
+            })
+            if entity_type == 'Partnership':
                 player_names = entity_info['name'].split(' and ')
                 if len(player_names) == 2:
-                    # Create or find individual player nodes
-                    for player_name in player_names:
-                        player_query = """
-                        MERGE (p:Player {name: $name})
-                        RETURN p
-                        """
-                        self.graph.run(player_query, name=player_name)
-
-                    # Create partnership relationship
-                    partnership_query = """
-                    MATCH (p1:Player {name: $player1})
-                    MATCH (p2:Player {name: $player2})
-                    MERGE (p1)-[r:PARTNERS_WITH]-(p2)
-                    RETURN r
-                    """
-                    self.graph.run(partnership_query, 
-                                 player1=player_names[0], 
-                                 player2=player_names[1])
-
-            self.logger.info(f"Created entity node: {entity_info['name']} ({entity_info['type']})")
-            return entity_node
+                    partner_pairs.append(player_names)
+
+    @staticmethod
+    def _bulk_merge_entities(tx, rows_by_label, partner_pairs):
+        """MERGE all entity rows and partnership pairs within one transaction"""
+        for label, rows in rows_by_label.items():
+            # Merge on the constrained Entity key, then add the type label
+            labels = f"Entity:{label}" if label else "Entity"
+            entity_query = _merge_entities_batch_query(labels)
+            for start in range(0, len(rows), UNWIND_BATCH_SIZE):
+                tx.run(entity_query,
+                       rows=rows[start:start + UNWIND_BATCH_SIZE]).consume()
+
+        # For partnerships, link both players in one batch
+        if partner_pairs:
+            for start in range(0, len(partner_pairs), UNWIND_BATCH_SIZE):
+                tx.run(MERGE_PARTNERSHIPS_BATCH_QUERY,
+                       pairs=partner_pairs[start:start + UNWIND_BATCH_SIZE]).consume()
+
+    def create_entity_nodes_bulk(self, entities, doc_id):
+        """Create entity nodes and link them to the document in batched writes"""
+        try:
+            # Group rows by their extra label so each label needs a single query
+            rows_by_label = {}
+            partner_pairs = []
+            self._group_entity_rows(entities, doc_id, rows_by_label, partner_pairs)
+
+            # All batches commit together in one transaction
+            self._write(self._bulk_merge_entities, rows_by_label, partner_pairs)
+
+            self.logger.info("Created %s entity nodes in bulk", len(entities))
 
         except Exception as e:
-            self.logger.error(f"Error creating entity node: {str(e)}")
+            self.logger.error("Error creating entity nodes in bulk: %s", e)
             raise
 
-    def create_visual_element_node(self, element_info, doc_node):
+    def create_visual_element_node(self, element_info, doc_id):
         """Create a visual element node and link it to the document"""
         try:
-            # Create visual element node
-            visual_node = Node("VisualElement",
-                             name=element_info['name'],
-                             type=element_info['type'])
+            # Create visual element node and its relationship to the document
+            visual_id = self._write(lambda tx: tx.run(CREATE_VISUAL_ELEMENT_QUERY,
+                                                      doc_id=doc_id,
+                                                      name=element_info['name'],
+                                                      type=element_info['type']).single()['visual_id'])
+            self.logger.info("Created visual element node: %s", element_info['name'])
+
+            return visual_id
+
+        except Exception as e:
+            self.logger.error("Error creating visual element node: %s", e)
+            raise
 
-            # Create relationship to document
-            relationship = Relationship(doc_node, "CONTAINS", visual_node)
+    @staticmethod
+    def _bulk_merge_visual_elements(tx, rows, doc_id):
+        """MERGE all visual element rows and their document links within one transaction"""
+        for start in range(0, len(rows), UNWIND_BATCH_SIZE):
+            tx.run(MERGE_VISUAL_ELEMENTS_BATCH_QUERY, doc_id=doc_id,
+                   rows=rows[start:start + UNWIND_BATCH_SIZE]).consume()
 
-            # Create both in a single transaction
-            self.graph.create(relationship)
-            self.logger.info(f"Created visual element node: {element_info['name']}")
+    def create_visual_element_nodes_bulk(self, elements, doc_id):
+        """Create visual element nodes and link them to the document in batched writes"""
+        try:
+            rows = [
+                {'name': element_info['name'], 'type': element_info['type']}
+                for element_info in elements
+            ]
+            self._write(self._bulk_merge_visual_elements, rows, doc_id)
 
-            return visual_node
+            self.logger.info("Created %s visual element nodes in bulk", len(rows))
 
         except Exception as e:
-            self.logger.error(f"Error creating visual element node: {str(e)}")
+            self.logger.error("Error creating visual element nodes in bulk: %s", e)
             raise
 
-    def create_relationship(self, source_name, source_type, target_name, target_type, 
+    def create_relationship(self, source_name, source_type, target_name, target_type,
                           rel_type, properties=None):
         """Create a relationship between two existing nodes"""
         try:
-            # Find source and target nodes
-            source_query = """
-            MATCH (n:Entity {name: $name, type: $type})
-            RETURN n LIMIT 1
-            """
-            source_result = self.graph.run(source_query, 
-                                         name=source_name, 
-                                         type=source_type).data()
-
-            target_query = """
-            MATCH (n:Entity {name: $name, type: $type})
-            RETURN n LIMIT 1
-            """
-            target_result = self.graph.run(target_query, 
-                                         name=target_name, 
-                                         type=target_type).data()
-
-            if not source_result or not target_result:
+            # Matching both endpoints in the create query doubles as the existence check
+            if self._apoc_available:
+                create_rel_query = CREATE_RELATIONSHIP_APOC_QUERY
+            else:
+                create_rel_query = _create_relationship_query(rel_type)
+            created = self._write(lambda tx: tx.run(create_rel_query,
+                                                    rel_type=rel_type,
+                                                    source_name=source_name,
+                                                    source_type=source_type,
+                                                    target_name=target_name,
+                                                    target_type=target_type,
+                                                    props=properties or {}).single()['created'])
+
+            if not created:
                 raise ValueError(f"Could not find nodes for relationship: {source_name} -> {target_name}")
 
-            # Create relationship with properties
-            create_rel_query = f"""
-            MATCH (s:Entity {{name: $source_name, type: $source_type}})
-            MATCH (t:Entity {{name: $target_name, type: $target_type}})
-            CREATE (s)-[r:{rel_type}]->(t)
-            SET r += $props
-            RETURN r
-            """
+            self.logger.info("Created relationship: %s -[%s]-> %s", source_name, rel_type, target_name)
 
-            self.graph.run(create_rel_query,
-                          source_name=source_name,
-                          source_type=source_type,
-                          target_name=target_name,
-                          target_type=target_type,
-                          props=properties or {})
+        except Exception as e:
+            self.logger.error("Error creating relationship: %s", e)
+            raise
 
-            self.logger.info(f"Created relationship: {source_name} -[{rel_type}]-> {target_name}")
+    @staticmethod
+    def _bulk_create_relationships(tx, create_rel_query, rows, rel_type):
+        """Create all relationship rows of one type within one transaction"""
+        created = 0
+        for start in range(0, len(rows), UNWIND_BATCH_SIZE):
+            created += tx.run(create_rel_query, rel_type=rel_type,
+                              rows=rows[start:start + UNWIND_BATCH_SIZE]).single()['created']
+        return created
+
+    def bulk_load(self, source_cypher, operation_cypher, params=None,
+                  batch_size=BULK_LOAD_BATCH_SIZE, parallel=True):
+        """Run operation_cypher for every row of source_cypher with apoc.periodic.iterate"""
+        if not self._apoc_iterate_available:
+            raise RuntimeError("apoc.periodic.iterate is not available on this server")
+        try:
+            records, _, _ = self.driver.execute_query(
+                BULK_LOAD_QUERY,
+                source=source_cypher,
+                operation=operation_cypher,
+                batch_size=batch_size,
+                parallel=parallel,
+                concurrency=BULK_LOAD_CONCURRENCY,
+                params=params or {},
+                database_=NEO4J_DATABASE)
+            result = records[0]
+            if result['failedOperations']:
+                raise RuntimeError(f"Bulk load failed for {result['failedOperations']} rows: "
+                                   f"{result['errorMessages']}")
+            self.logger.info("Bulk loaded %s rows", result['committedOperations'])
+            return result['committedOperations']
 
         except Exception as e:
-            self.logger.error(f"Error creating relationship: {str(e)}")
-            raise
\ No newline at end of file
+            self.logger.error("Error running bulk load: %s", e)
+            raise
+        finally:
+            # Batches that committed before a failure still changed the graph
+            self._bump_write_epoch()
+
+    def create_relationships_batch(self, rows, rel_type):
+        """Create relationships of one type from rows of {sn, st, tn, tt, props}"""
+        try:
+            # Rows may come from a generator
+            rows = list(rows)
+
+            # Very large loads are batched server-side; parallel batches would
+            # deadlock on shared endpoint nodes, so they run one at a time
+            if self._apoc_iterate_available and len(rows) >= BULK_LOAD_THRESHOLD:
+                return self.bulk_load(BULK_RELATIONSHIP_SOURCE, BULK_RELATIONSHIP_OPERATION,
+                                      params={'rows': rows, 'rel_type': rel_type},
+                                      parallel=False)
+
+            if self._apoc_available:
+                create_rel_query = CREATE_RELATIONSHIPS_BATCH_APOC_QUERY
+            else:
+                create_rel_query = _create_relationships_batch_query(rel_type)
+            created = self._write(self._bulk_create_relationships,
+                                  create_rel_query, rows, rel_type)
+
+            # Rows whose endpoints do not exist are skipped by the MATCH
+            if created < len(rows):
+                self.logger.warning("Created %s of %s %s relationships; some endpoints were not found",
+                                    created, len(rows), rel_type)
+            else:
+                self.logger.info("Created %s %s relationships in bulk", created, rel_type)
+            return created
+
+        except Exception as e:
+            self.logger.error("Error creating relationships in bulk: %s", e)
+            raise
+
+def _close_graph_service():
+    """Close the shared driver when the process exits"""
+    if _instance is not None:
+        _instance.driver.close()
+
+def get_graph_service():
+    """Return the process-wide GraphService, creating it on first use"""
+    global _instance
+    with _instance_lock:
+        if _instance is None:
+            _instance = GraphService()
+            atexit.register(_close_graph_service)
+        return _instance
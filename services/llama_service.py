@@ -1,15 +1,290 @@
 import os
 import logging
+import hashlib
+import json
+import re
+import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import httpx
+import numpy as np
 from typing import Dict, List, Any, Optional
 from config import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
 from anthropic import Anthropic
 from openai import OpenAI
 from services.semantic_processor import SemanticProcessor
+from services.graph_service import get_graph_service
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of generated responses kept in memory
+RESPONSE_CACHE_SIZE = 256
+
+# Cosine similarity at which a cached response is reused for a differently worded query
+RESPONSE_CACHE_SIMILARITY = 0.95
+
+# Complete query results kept in memory, and for how many seconds; entries are
+# also dropped as soon as this process writes to the graph
+QUERY_RESULT_CACHE_SIZE = 256
+QUERY_RESULT_CACHE_TTL = 300
+
+# Graph context rows per query kept in memory, and for how many seconds; a hit
+# also skips the query embedding and entity extraction
+GRAPH_RESULTS_CACHE_SIZE = 256
+GRAPH_RESULTS_CACHE_TTL = 300
+
+# Keyword searches whose matching document ids are kept in memory, and for how many
+# seconds; the TTL bounds staleness from documents written by other processes
+SEARCH_CACHE_SIZE = 2048
+SEARCH_CACHE_TTL = 60
+
+# Characters with special meaning in Lucene full-text query syntax
+LUCENE_SPECIAL_CHARS = re.compile(r'([+\-&|!(){}\[\]^"~*?:\\/])')
+
+# Graph context queries; the text is sent byte-identical on every call so the
+# server reuses the cached plan (size the cache with server.db.query_cache_size)
+
+# Ids of the documents whose title or text match the query keywords
+KEYWORD_QUERY = """
+UNWIND CASE WHEN $search = '' THEN [] ELSE [$search] END AS search
+CALL db.index.fulltext.queryNodes('document_text_ft', search) YIELD node AS d
+RETURN elementId(d) as doc_id
+"""
+
+# Entities matching the keywords or linked into the graph, ranked by how many documents mention them.
+# The optional document filters apply to the counted and listed documents; with a filter
+# set, entities without any matching document are dropped.
+ENTITY_QUERY = """
+// Match entities and their relationships
+CALL {
+    UNWIND CASE WHEN $search = '' THEN [] ELSE [$search] END AS search
+    CALL db.index.fulltext.queryNodes('entity_name_ft', search) YIELD node
+    RETURN node AS e
+    UNION
+    MATCH (e:Entity)
+    WHERE exists((e)-[:RELATES_TO|DEVELOPS|FOCUSES_ON|CONTAINS]-())
+    RETURN e
+}
+WITH e
+WHERE e.name IS NOT NULL
+
+// Score each entity by its connected documents without materializing them
+CALL {
+    WITH e
+    OPTIONAL MATCH (d:Document)-->(e)
+    WHERE d.title IS NOT NULL
+      AND ($titles IS NULL OR d.title IN $titles)
+      AND ($since IS NULL OR d.timestamp >= $since)
+      AND ($until IS NULL OR d.timestamp <= $until)
+    RETURN count(DISTINCT d) as doc_count
+}
+WITH e, doc_count
+WHERE doc_count > 0 OR ($titles IS NULL AND $since IS NULL AND $until IS NULL)
+ORDER BY doc_count DESC
+LIMIT 10
+
+// Collect document titles only for the entities that are returned
+CALL {
+    WITH e
+    OPTIONAL MATCH (d:Document)-->(e)
+    WHERE d.title IS NOT NULL
+      AND ($titles IS NULL OR d.title IN $titles)
+      AND ($since IS NULL OR d.timestamp >= $since)
+      AND ($until IS NULL OR d.timestamp <= $until)
+    RETURN collect(DISTINCT d.title) as documents
+}
+RETURN {
+  name: e.name,
+  type: e.type,
+  documents: documents,
+  relevance: doc_count
+} as entity_info
+ORDER BY entity_info.relevance DESC
+"""
+
+# Candidate documents matching the keywords or query entities; documents without
+# entities are kept
+DOCUMENT_MATCHES = """
+CALL {
+    MATCH (d:Document) WHERE elementId(d) IN $doc_ids
+    OPTIONAL MATCH (d)-[r:CONTAINS]->(e:Entity)
+    RETURN d, r, e
+    UNION
+    MATCH (e:Entity) WHERE e.name_lower IN $entities
+    WITH e
+    MATCH (d:Document)-[r:CONTAINS]->(e)
+    RETURN d, r, e
+"""
+
+# Extra candidates nearest to the query embedding, only sent when the vector index exists
+DOCUMENT_VECTOR_MATCHES = """\
+    UNION
+    CALL db.index.vector.queryNodes('document_embedding', $top_k, $embedding) YIELD node AS d
+    OPTIONAL MATCH (d)-[r:CONTAINS]->(e:Entity)
+    RETURN d, r, e
+"""
+
+# Candidates ranked by semantic, relationship and entity scores.
+# Optional filters restrict the titles and the ISO timestamp range.
+DOCUMENT_RANKING = """\
+}
+WITH d, r, e
+WHERE ($titles IS NULL OR d.title IN $titles)
+  AND ($since IS NULL OR d.timestamp >= $since)
+  AND ($until IS NULL OR d.timestamp <= $until)
+WITH d {.title} as doc_info,
+     d.embedding as doc_embedding,
+     $embedding as query_embedding,
+     count(distinct e) as entity_matches,
+     count(distinct r) as relationship_count
+WITH doc_info, doc_embedding, query_embedding, entity_matches, relationship_count,
+     CASE 
+        WHEN doc_embedding IS NOT NULL
+        THEN reduce(dot = 0.0, i IN range(0, size(doc_embedding)-1) | 
+             dot + doc_embedding[i] * query_embedding[i]) /
+             (sqrt(reduce(norm = 0.0, i IN range(0, size(doc_embedding)-1) | 
+             norm + doc_embedding[i] * doc_embedding[i])) *
+             sqrt(reduce(norm = 0.0, i IN range(0, size(query_embedding)-1) | 
+             norm + query_embedding[i] * query_embedding[i])))
+        ELSE 0.0
+     END as semantic_score,
+     CASE WHEN relationship_count > 0 THEN relationship_count / 5.0 ELSE 0 END AS relationship_score
+WITH doc_info, entity_matches, relationship_score,
+     semantic_score * 0.5 + 
+     relationship_score * 0.3 +
+     CASE WHEN entity_matches > 0 
+     THEN 0.2 * (entity_matches/5.0) ELSE 0 END as combined_score
+WHERE combined_score > 0.3
+RETURN doc_info, combined_score, entity_matches
+ORDER BY combined_score DESC
+LIMIT 5
+"""
+
+# Document search with and without the vector branch; servers without vector index
+# support reject any query that names db.index.vector.queryNodes
+DOCUMENT_QUERY = DOCUMENT_MATCHES + DOCUMENT_RANKING
+DOCUMENT_VECTOR_QUERY = DOCUMENT_MATCHES + DOCUMENT_VECTOR_MATCHES + DOCUMENT_RANKING
+
+# Nearest documents fetched from the vector index per query, and when filters are
+# given; the index cannot filter during its search, so filtered queries fetch more
+DOCUMENT_VECTOR_TOP_K = 10
+FILTERED_DOCUMENT_VECTOR_TOP_K = 50
+
+# Document filters accepted by process_query
+DOCUMENT_FILTERS = ('titles', 'since', 'until')
+
+# Static instructions sent ahead of every query as the system prompt
+SYSTEM_PROMPT = """I am a knowledge graph assistant that only answers from the connected graph database and politely decline general conversation.
+
+With context: answer directly and concisely from it, cite entities explicitly, group related facts into short paragraphs each ending with its reference number, and never name document titles.
+
+Without matches: briefly explain I can only answer from the knowledge graph and suggest asking about specific topics or documents."""
+
+# Anthropic model for everyday queries, and the slower one used when quality="high"
+ANTHROPIC_MODEL = "claude-3-5-haiku-20241022"
+ANTHROPIC_HIGH_QUALITY_MODEL = "claude-3-5-sonnet-20241022"
+
+# Generation limits; short, low-temperature answers come back faster and repeat more reliably
+RESPONSE_MAX_TOKENS = 350
+RESPONSE_TEMPERATURE = 0.4
+
+# Per-query user messages, filled in with str.format
+CONTEXT_PROMPT = """Help me answer this query: "{query}"
+
+Context information:
+{context}"""
+
+NO_MATCH_PROMPT = """I need to respond to this query: "{query}"
+
+No matches were found in the knowledge graph for this query."""
+
+NO_DATA_PROMPT = ("I apologize, but I don't have access to any knowledge graph data at the moment. "
+                  "Please try uploading some documents first or ask a different question.")
+
+# Appended to a streamed answer when the LLM fails part way through
+STREAM_ERROR_RESPONSE = "I apologize, but I encountered an error while generating a response. Please try again."
+
+# Reply for blank, punctuation-only or stopword-only queries, which never reach the graph or LLM
+VAGUE_QUERY_RESPONSE = "Please provide a more specific question."
+
+# Single words too generic to search for on their own
+QUERY_STOPWORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'can', 'do', 'for', 'from',
+    'have', 'he', 'her', 'his', 'how', 'i', 'if', 'in', 'is', 'it', 'me', 'my', 'no',
+    'not', 'of', 'on', 'or', 'she', 'so', 'that', 'the', 'they', 'this', 'to', 'was',
+    'we', 'what', 'when', 'where', 'who', 'why', 'with', 'you'
+})
+
+# Answer lookups of a single known entity from the graph without calling the LLM
+DIRECT_ANSWERS = os.environ.get("BEACHBOOK_DIRECT_ANSWERS", "1") == "1"
+
+DIRECT_ANSWER_TEMPLATE = """**{name}** ({type})
+
+Mentioned in: {documents}"""
+
+# Phrases marking a query that asks about the graph's contents
+CONTENT_QUERY_KEYWORDS = ('what', 'tell me about', 'show me', 'list', 'topics')
+
+# Keep-alive connection pool shared by every request to the LLM APIs
+LLM_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50)
+LLM_HTTP_TIMEOUT = 30.0
+
+@lru_cache(maxsize=1)
+def _get_anthropic_client() -> Anthropic:
+    """Create the Anthropic client and its connection pool once per process"""
+    return Anthropic(http_client=httpx.Client(limits=LLM_HTTP_LIMITS, timeout=LLM_HTTP_TIMEOUT))
+
+@lru_cache(maxsize=1)
+def _get_openai_client() -> OpenAI:
+    """Create the OpenAI client and its connection pool once per process"""
+    return OpenAI(http_client=httpx.Client(limits=LLM_HTTP_LIMITS, timeout=LLM_HTTP_TIMEOUT))
+
+def _quantize_embedding(embedding):
+    """Normalize an embedding and keep it as int8 codes with a per-vector scale"""
+    vector = np.asarray(embedding, dtype=np.float32)
+    vector = vector / (np.linalg.norm(vector) or 1.0)
+    scale = float(np.abs(vector).max()) / 127.0 or 1.0
+    return np.round(vector / scale).astype(np.int8), scale
+
+def _quantized_similarities(quantized, query_embedding):
+    """Cosine similarities between quantized embeddings and a query embedding"""
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / (np.linalg.norm(query) or 1.0)
+    codes = np.stack([codes for codes, _ in quantized]).astype(np.float32)
+    scales = np.array([scale for _, scale in quantized], dtype=np.float32)
+    return (codes @ query) * scales
+
+def _filter_key(filters: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Hashable form of the document filters for cache keys"""
+    return json.dumps(filters, sort_keys=True) if filters else None
+
+def _fulltext_search(keywords: List[str]) -> str:
+    """Build a full-text query matching any of the keywords"""
+    return " OR ".join(LUCENE_SPECIAL_CHARS.sub(r'\\\1', keyword) for keyword in keywords if keyword)
+
 class LlamaService:
+    # Responses keyed by (normalized query, context hash), shared by all instances;
+    # query embeddings are kept as int8 codes for the similarity lookups
+    _response_cache = OrderedDict()
+    _response_cache_lock = threading.Lock()
+
+    # Query results keyed by (normalized query, quality, graph write epoch, filters), shared by all instances
+    _result_cache = OrderedDict()
+    _result_cache_lock = threading.Lock()
+
+    # Graph context rows keyed by (query, top_k, graph write epoch, filters), shared by all instances
+    _graph_results_cache = OrderedDict()
+    _graph_results_cache_lock = threading.Lock()
+
+    # Keyword document ids keyed by (search, graph write epoch), shared by all instances
+    _search_cache = OrderedDict()
+    _search_cache_lock = threading.Lock()
+
+    # Runs the independent graph context queries side by side
+    _query_pool = ThreadPoolExecutor(max_workers=4)
+
     def __init__(self):
         """Initialize the LlamaService with required components"""
         self.logger = logging.getLogger(__name__)
@@ -36,7 +311,7 @@ class LlamaService:
             anthropic_key = os.environ.get('ANTHROPIC_API_KEY')
             if anthropic_key:
                 try:
-                    self._anthropic = Anthropic()
+                    self._anthropic = _get_anthropic_client()
                     self.logger.info("Anthropic client initialized successfully")
                 except Exception as e:
                     self.logger.error(f"Failed to initialize Anthropic: {str(e)}")
@@ -49,7 +324,7 @@ class LlamaService:
                 openai_key = os.environ.get('OPENAI_API_KEY')
                 if openai_key:
                     try:
-                        self._openai = OpenAI()
+                        self._openai = _get_openai_client()
                         self.logger.info("OpenAI client initialized successfully")
                     except Exception as e:
                         self.logger.error(f"Failed to initialize OpenAI: {str(e)}")
@@ -81,19 +356,8 @@ class LlamaService:
             try:
                 if all([NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD]):
                     start_time = time.time()
-                    from py2neo import Graph, ConnectionProfile
-                    from urllib.parse import urlparse
-
-                    uri = urlparse(NEO4J_URI)
-                    bolt_uri = f"bolt+s://{uri.netloc}" if uri.scheme == 'neo4j+s' else f"bolt://{uri.netloc}"
-
-                    profile = ConnectionProfile(
-                        uri=bolt_uri,
-                        user=NEO4J_USER,
-                        password=NEO4J_PASSWORD
-                    )
-                    self._graph = Graph(profile=profile)
-                    self._graph.run("RETURN 1 as test").data()
+                    # Borrow sessions from the pooled driver shared with GraphService
+                    self._graph = get_graph_service()
                     init_time = time.time() - start_time
                     self.logger.info(f"Neo4j connection established in {init_time:.2f} seconds")
                 else:
@@ -103,8 +367,13 @@ class LlamaService:
                 self._graph = None
         return self._graph
 
-    def process_query(self, query_text: str) -> Dict[str, Any]:
-        """Process a query and generate a response"""
+    def process_query(self, query_text: str, quality: str = "default",
+                      filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Process a query and generate a response
+
+        filters may restrict the documents used as context by 'titles' (a list) and
+        by 'since'/'until' ISO timestamps.
+        """
         try:
             if not (self._anthropic or self._openai):
                 return {
@@ -114,15 +383,42 @@ class LlamaService:
                     }
                 }
 
+            # Answer degenerate queries directly instead of running the whole pipeline
+            if self._is_vague_query(query_text):
+                return {
+                    'response': VAGUE_QUERY_RESPONSE,
+                    'technical_details': {
+                        'queries': {}
+                    }
+                }
+
+            # Repeated queries skip the graph and the LLM until the graph changes
+            result_key = (" ".join(query_text.lower().split()), quality,
+                          self.graph.write_epoch if self.graph else None, _filter_key(filters))
+            cached = self._get_cached_result(result_key)
+            query_embedding = None
+            if cached is None and self._semantic_processor:
+                # Reworded versions of a recent query reuse its result as well
+                query_embedding = self._semantic_processor.get_text_embedding(query_text)
+                cached = self._find_similar_result(result_key, query_embedding)
+            if cached is not None:
+                self.logger.debug("Serving query result from cache")
+                return cached
+
             self.logger.info(f"Processing query: {query_text}")
 
-            # Get graph context if available (lazy-loaded)
-            graph_results = self._get_graph_overview(query_text) if self.graph else None
+            # Get graph context if available (lazy-loaded); answer without it if the graph fails
+            results, graph_failed = self._try_graph_results(query_text, query_embedding, filters)
+            graph_results = self._format_overview(*results) if results else None
 
-            # Generate response using Claude
-            response = self.generate_response(query_text, graph_results)
+            # A query naming exactly one entity is answered straight from the graph.
+            # generate_response raises when the LLM fails, so its apology is never cached.
+            response = self._direct_answer(query_text, *results) if results and DIRECT_ANSWERS else None
+            if response is None:
+                # Generate response using Claude
+                response = self.generate_response(query_text, graph_results, quality, query_embedding)
 
-            return {
+            result = {
                 'response': response,
                 'technical_details': {
                     'queries': {
@@ -130,6 +426,10 @@ class LlamaService:
                     }
                 }
             }
+            # A result built without graph context because of an error is not reused
+            if not graph_failed:
+                self._cache_result(result_key, result, query_embedding)
+            return result
 
         except Exception as e:
             self.logger.error(f"Error processing query: {str(e)}", exc_info=True)
@@ -140,8 +440,73 @@ class LlamaService:
                 }
             }
 
-    def generate_response(self, query: str, context_info: Optional[str] = None) -> str:
-        """Generate a natural language response using available LLM"""
+    def stream_query(self, query_text: str, quality: str = "default",
+                     filters: Optional[Dict[str, Any]] = None):
+        """Process a query and yield the response in pieces as it is generated"""
+        try:
+            if not (self._anthropic or self._openai):
+                yield "I apologize, but the knowledge service is currently unavailable. Please try again later."
+                return
+
+            if self._is_vague_query(query_text):
+                yield VAGUE_QUERY_RESPONSE
+                return
+
+            # Cached results come back whole, exactly as from process_query
+            result_key = (" ".join(query_text.lower().split()), quality,
+                          self.graph.write_epoch if self.graph else None, _filter_key(filters))
+            cached = self._get_cached_result(result_key)
+            query_embedding = None
+            if cached is None and self._semantic_processor:
+                query_embedding = self._semantic_processor.get_text_embedding(query_text)
+                cached = self._find_similar_result(result_key, query_embedding)
+            if cached is not None:
+                yield cached['response']
+                return
+
+            self.logger.info(f"Streaming query: {query_text}")
+
+            # Failed graph or LLM calls still produce an answer, but it is not cached
+            results, failed = self._try_graph_results(query_text, query_embedding, filters)
+            graph_results = self._format_overview(*results) if results else None
+
+            response = self._direct_answer(query_text, *results) if results and DIRECT_ANSWERS else None
+            if response is not None:
+                yield response
+            else:
+                parts = []
+                try:
+                    for text in self.stream_response(query_text, graph_results, quality, query_embedding):
+                        parts.append(text)
+                        yield text
+                except Exception:
+                    failed = True
+                    yield STREAM_ERROR_RESPONSE
+                response = "".join(parts)
+
+            if not failed:
+                self._cache_result(result_key, {
+                    'response': response,
+                    'technical_details': {
+                        'queries': {
+                            'graph_context': graph_results
+                        }
+                    }
+                }, query_embedding)
+
+        except Exception as e:
+            self.logger.error(f"Error streaming query: {str(e)}", exc_info=True)
+            yield "I encountered an error while processing your request. Please try again."
+
+    def _is_vague_query(self, query_text: str) -> bool:
+        """Check whether a query is too short or generic to be worth answering"""
+        stripped = query_text.strip()
+        return (len(stripped) < 2 or not any(ch.isalnum() for ch in stripped)
+                or stripped.lower().strip('?.,!') in QUERY_STOPWORDS)
+
+    def generate_response(self, query: str, context_info: Optional[str] = None,
+                          quality: str = "default", query_embedding=None) -> str:
+        """Generate a natural language response using available LLM; raises if the LLM call fails"""
         try:
             if not self._anthropic and not self._openai:
                 return "The knowledge service is currently unavailable. Please try again later."
@@ -150,55 +515,42 @@ class LlamaService:
             self.logger.debug(f"Query: {query}")
             self.logger.debug(f"Context available: {'Yes' if context_info else 'No'}")
 
-            system_message = "I am a knowledge graph assistant that only provides information from the connected graph database. I stay focused on available content and politely decline general conversation."
-
-            if context_info:
-                user_message = f"""Based on the following context from a knowledge graph, help me answer this query: "{query}"
-
-Context information:
-{context_info}
-
-Please provide a natural, conversational response using information from the provided context. Group related information into paragraphs and add the reference number at the end of each paragraph, not within the text. Do not mention document titles directly. Focus on facts and relationships found in the documents."""
-            else:
-                is_content_query = any(keyword in query.lower() for keyword in 
-                    ['what', 'tell me about', 'show me', 'list', 'topics'])
-
-                if is_content_query:
-                    user_message = ("I apologize, but I don't have access to any knowledge graph data at the moment. "
-                                  "Please try uploading some documents first or ask a different question.")
-                else:
-                    user_message = f"""I need to respond to this query: "{query}"
+            model = ANTHROPIC_HIGH_QUALITY_MODEL if quality == "high" else ANTHROPIC_MODEL
+            cached, cache_key = self._lookup_response(query, context_info, model, query_embedding)
+            if cached is not None:
+                self.logger.debug("Serving response from cache")
+                return cached
 
-Since I don't find any matches in the knowledge graph for this query, I should:
-1. Politely explain that I can only provide information that exists in the knowledge graph
-2. Suggest that the user ask about specific topics or documents
-3. Keep the response brief and focused"""
+            user_message = self._build_user_message(query, context_info)
 
             try:
                 if self._anthropic:
                     self.logger.debug("Using Anthropic for response generation")
                     response = self._anthropic.messages.create(
-                        model="claude-3-5-sonnet-20241022",
-                        max_tokens=1000,
-                        temperature=0.7,
+                        model=model,
+                        max_tokens=RESPONSE_MAX_TOKENS,
+                        temperature=RESPONSE_TEMPERATURE,
+                        system=SYSTEM_PROMPT,
                         messages=[
-                            {"role": "assistant", "content": system_message},
                             {"role": "user", "content": user_message}
                         ]
                     )
-                    return response.content[0].text
+                    response_text = response.content[0].text
                 else:
                     self.logger.debug("Using OpenAI for response generation")
                     response = self._openai.chat.completions.create(
                         model="gpt-4-turbo-preview",
-                        max_tokens=1000,
-                        temperature=0.7,
+                        max_tokens=RESPONSE_MAX_TOKENS,
+                        temperature=RESPONSE_TEMPERATURE,
                         messages=[
-                            {"role": "system", "content": system_message},
+                            {"role": "system", "content": SYSTEM_PROMPT},
                             {"role": "user", "content": user_message}
                         ]
                     )
-                    return response.choices[0].message.content
+                    response_text = response.choices[0].message.content
+
+                self._cache_response(*cache_key, response_text)
+                return response_text
 
             except Exception as e:
                 self.logger.error(f"Error calling LLM API: {str(e)}", exc_info=True)
@@ -207,144 +559,299 @@ Since I don't find any matches in the knowledge graph for this query, I should:
                 raise
 
         except Exception as e:
-            self.logger.error(f"Error generating response: {str(e)}", exc_info=True)
-            return "I apologize, but I encountered an error while generating a response. Please try again."
+            # Raise rather than return an apology, which callers would cache as an answer
+            self.logger.error(f"Error generating response: {str(e)}")
+            raise
 
-    def _get_graph_overview(self, query_text: str) -> Optional[str]:
-        """Enhanced graph overview with hybrid retrieval"""
+    def stream_response(self, query: str, context_info: Optional[str] = None,
+                        quality: str = "default", query_embedding=None):
+        """Yield a natural language response in pieces as the LLM generates it"""
         try:
-            if not self.graph:
-                return None
+            if not self._anthropic and not self._openai:
+                yield "The knowledge service is currently unavailable. Please try again later."
+                return
+
+            model = ANTHROPIC_HIGH_QUALITY_MODEL if quality == "high" else ANTHROPIC_MODEL
+            cached, cache_key = self._lookup_response(query, context_info, model, query_embedding)
+            if cached is not None:
+                self.logger.debug("Serving response from cache")
+                yield cached
+                return
+
+            user_message = self._build_user_message(query, context_info)
+            parts = []
+            if self._anthropic:
+                self.logger.debug("Streaming response from Anthropic")
+                with self._anthropic.messages.stream(
+                    model=model,
+                    max_tokens=RESPONSE_MAX_TOKENS,
+                    temperature=RESPONSE_TEMPERATURE,
+                    system=SYSTEM_PROMPT,
+                    messages=[
+                        {"role": "user", "content": user_message}
+                    ]
+                ) as stream:
+                    for text in stream.text_stream:
+                        parts.append(text)
+                        yield text
+            else:
+                self.logger.debug("Streaming response from OpenAI")
+                stream = self._openai.chat.completions.create(
+                    model="gpt-4-turbo-preview",
+                    max_tokens=RESPONSE_MAX_TOKENS,
+                    temperature=RESPONSE_TEMPERATURE,
+                    stream=True,
+                    messages=[
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": user_message}
+                    ]
+                )
+                for chunk in stream:
+                    text = chunk.choices[0].delta.content if chunk.choices else None
+                    if text:
+                        parts.append(text)
+                        yield text
+
+            self._cache_response(*cache_key, "".join(parts))
 
-            # Extract query entities and keywords using semantic processor
-            semantic_analysis = self._semantic_processor.analyze_query(query_text)
-            query_entities = [entity['text'].lower() for entity in semantic_analysis['entities']]
-            keywords = query_text.lower().split()
-
-            # Initial keyword matching query
-            keyword_query = """
-            MATCH (d:Document)
-            WHERE any(keyword IN $keywords 
-                WHERE toLower(d.title) CONTAINS toLower(keyword))
-            RETURN d.title as matching_docs
-            """
-            keyword_matches = self.graph.run(keyword_query, 
-                                           keywords=keywords).data()
-
-            # Enhanced entity-focused query
-            entity_query = """
-            // Match entities and their relationships
-            MATCH (e:Entity)
-            WHERE e.name IS NOT NULL
-            AND (
-                any(keyword IN $keywords WHERE toLower(e.name) CONTAINS toLower(keyword))
-                OR exists((e)-[:RELATES_TO|DEVELOPS|FOCUSES_ON|CONTAINS]-())
-            )
-
-            // Get connected documents and relationships
-            OPTIONAL MATCH (d:Document)-[r]->(e)
-            WHERE d.title IS NOT NULL
-
-            // Aggregate results with scoring
-            WITH e,
-                 collect(DISTINCT {
-                   title: d.title,
-                   relationship: type(r)
-                 }) as document_refs,
-                 count(DISTINCT d) as doc_count
-
-            RETURN {
-              name: e.name,
-              type: e.type,
-              documents: [doc in document_refs | doc.title],
-              relevance: doc_count
-            } as entity_info
-            ORDER BY entity_info.relevance DESC
-            LIMIT 10
-            """
-            # Split query into keywords and remove punctuation
-            keywords = [word.strip('?.,!') for word in query_text.lower().split()]
-
-            entity_results = self.graph.run(entity_query, 
-                                          keywords=keywords,
-                                          entities=query_entities).data()
-
-            # Enhanced hybrid retrieval combining semantic and graph structure
-            doc_query = """
-            MATCH (d:Document)-[r:CONTAINS]->(e:Entity)
-            WHERE any(keyword IN $keywords WHERE 
-                  toLower(d.title) CONTAINS keyword OR
-                  toLower(d.content) CONTAINS keyword)
-            OR e.name IN $entities
-            WITH d {.title, .content} as doc_info,
-                 d.embedding as doc_embedding,
-                 $embedding as query_embedding,
-                 count(distinct e) as entity_matches,
-                 count(distinct r) as relationship_count
-            WITH doc_info, doc_embedding, query_embedding, entity_matches, relationship_count,
-                 CASE 
-                    WHEN doc_embedding IS NOT NULL
-                    THEN reduce(dot = 0.0, i IN range(0, size(doc_embedding)-1) | 
-                         dot + doc_embedding[i] * query_embedding[i]) /
-                         (sqrt(reduce(norm = 0.0, i IN range(0, size(doc_embedding)-1) | 
-                         norm + doc_embedding[i] * doc_embedding[i])) *
-                         sqrt(reduce(norm = 0.0, i IN range(0, size(query_embedding)-1) | 
-                         norm + query_embedding[i] * query_embedding[i])))
-                    ELSE 0.0
-                 END as semantic_score,
-                 CASE WHEN relationship_count > 0 THEN relationship_count / 5.0 ELSE 0 END AS relationship_score
-            WITH doc_info, entity_matches, relationship_score,
-                 semantic_score * 0.5 + 
-                 relationship_score * 0.3 +
-                 CASE WHEN entity_matches > 0 
-                 THEN 0.2 * (entity_matches/5.0) ELSE 0 END as combined_score
-            WHERE combined_score > 0.3
-            RETURN doc_info, combined_score, entity_matches
-            ORDER BY combined_score DESC
-            LIMIT 5
-            """
-            doc_results = self.graph.run(doc_query, 
-                                       keywords=keywords,
-                                       entities=query_entities,
-                                       embedding=self._semantic_processor.get_text_embedding(query_text)).data()
-
-
-            if not entity_results and not doc_results:
+        except Exception as e:
+            # Raise rather than yield an apology, which callers would cache as an answer
+            self.logger.error(f"Error streaming response: {str(e)}", exc_info=True)
+            raise
+
+    def _build_user_message(self, query: str, context_info: Optional[str]) -> str:
+        """Build the user message; the instructions live in SYSTEM_PROMPT"""
+        if context_info:
+            return CONTEXT_PROMPT.format(query=query, context=context_info)
+
+        is_content_query = any(keyword in query.lower() for keyword in CONTENT_QUERY_KEYWORDS)
+        if is_content_query:
+            return NO_DATA_PROMPT
+        return NO_MATCH_PROMPT.format(query=query)
+
+    def _lookup_response(self, query: str, context_info: Optional[str], model: str,
+                         query_embedding=None):
+        """Return a cached response for the query, if any, and the key to cache a new one under"""
+        # Serve repeated and near-duplicate queries over the same context and model from cache
+        normalized_query = " ".join(query.lower().split())
+        context_hash = hashlib.sha256(f"{model}\n{context_info or ''}".encode('utf-8')).hexdigest()
+        cached = self._get_cached_response(normalized_query, context_hash)
+        if cached is None and self._semantic_processor:
+            # Reuse the embedding the caller already computed for this query
+            if query_embedding is None:
+                query_embedding = self._semantic_processor.get_text_embedding(normalized_query)
+            cached = self._find_similar_response(query_embedding, context_hash)
+        return cached, (normalized_query, context_hash, query_embedding)
+
+    def _get_cached_response(self, normalized_query: str, context_hash: str) -> Optional[str]:
+        """Return the cached response for an identical query and context"""
+        with LlamaService._response_cache_lock:
+            entry = LlamaService._response_cache.get((normalized_query, context_hash))
+            if entry is None:
                 return None
+            LlamaService._response_cache.move_to_end((normalized_query, context_hash))
+            return entry[1]
+
+    def _find_similar_response(self, query_embedding, context_hash: str) -> Optional[str]:
+        """Return the cached response whose query is most similar, above the threshold"""
+        with LlamaService._response_cache_lock:
+            candidates = [(key, entry) for key, entry in LlamaService._response_cache.items()
+                          if key[1] == context_hash and entry[0] is not None]
+            if not candidates:
+                return None
+            similarities = _quantized_similarities([entry[0] for _, entry in candidates], query_embedding)
+            best = int(np.argmax(similarities))
+            if similarities[best] < RESPONSE_CACHE_SIMILARITY:
+                return None
+            key, entry = candidates[best]
+            LlamaService._response_cache.move_to_end(key)
+            return entry[1]
+
+    def _cache_response(self, normalized_query: str, context_hash: str, query_embedding, response_text: str):
+        """Store a generated response, evicting the least recently used entries"""
+        if query_embedding is not None:
+            query_embedding = _quantize_embedding(query_embedding)
+        with LlamaService._response_cache_lock:
+            LlamaService._response_cache[(normalized_query, context_hash)] = (query_embedding, response_text)
+            LlamaService._response_cache.move_to_end((normalized_query, context_hash))
+            while len(LlamaService._response_cache) > RESPONSE_CACHE_SIZE:
+                LlamaService._response_cache.popitem(last=False)
+
+    def _get_cached_result(self, key) -> Optional[Dict[str, Any]]:
+        """Return the cached result for a query if it has not expired"""
+        with LlamaService._result_cache_lock:
+            entry = LlamaService._result_cache.get(key)
+            if entry is None or time.monotonic() - entry[0] >= QUERY_RESULT_CACHE_TTL:
+                return None
+            LlamaService._result_cache.move_to_end(key)
+            return entry[1]
+
+    def _find_similar_result(self, key, query_embedding) -> Optional[Dict[str, Any]]:
+        """Return the unexpired cached result whose query is most similar, above the threshold"""
+        now = time.monotonic()
+        with LlamaService._result_cache_lock:
+            candidates = [(cached_key, entry) for cached_key, entry in LlamaService._result_cache.items()
+                          if cached_key[1:] == key[1:] and entry[2] is not None
+                          and now - entry[0] < QUERY_RESULT_CACHE_TTL]
+            if not candidates:
+                return None
+            similarities = _quantized_similarities([entry[2] for _, entry in candidates], query_embedding)
+            best = int(np.argmax(similarities))
+            if similarities[best] < RESPONSE_CACHE_SIMILARITY:
+                return None
+            cached_key, entry = candidates[best]
+            LlamaService._result_cache.move_to_end(cached_key)
+            return entry[1]
+
+    def _cache_result(self, key, result: Dict[str, Any], query_embedding=None):
+        """Store a query result, evicting the least recently used entries"""
+        if query_embedding is not None:
+            query_embedding = _quantize_embedding(query_embedding)
+        with LlamaService._result_cache_lock:
+            LlamaService._result_cache[key] = (time.monotonic(), result, query_embedding)
+            LlamaService._result_cache.move_to_end(key)
+            while len(LlamaService._result_cache) > QUERY_RESULT_CACHE_SIZE:
+                LlamaService._result_cache.popitem(last=False)
+
+    def _search_document_ids(self, search: str) -> List[str]:
+        """Return the ids of documents matching a keyword search, cached until the graph changes"""
+        key = (search, self.graph.write_epoch)
+        now = time.monotonic()
+        with LlamaService._search_cache_lock:
+            entry = LlamaService._search_cache.get(key)
+            if entry is not None and now - entry[0] < SEARCH_CACHE_TTL:
+                LlamaService._search_cache.move_to_end(key)
+                return entry[1]
+
+        doc_ids = [record['doc_id'] for record in self.graph.read_query(KEYWORD_QUERY, search=search)]
+
+        with LlamaService._search_cache_lock:
+            LlamaService._search_cache[key] = (now, doc_ids)
+            LlamaService._search_cache.move_to_end(key)
+            while len(LlamaService._search_cache) > SEARCH_CACHE_SIZE:
+                LlamaService._search_cache.popitem(last=False)
+        return doc_ids
 
-            # Format overview as a numbered reference list
-            overview = []
-            ref_count = 1
-            doc_refs = {}
-
-            # Add document information with reference numbers
-            if doc_results:
-                overview.append("Referenced Documents:")
-                for result in doc_results:
-                    title = result['doc_info']['title']
-                    doc_refs[title] = ref_count
-                    overview.append(f"[{ref_count}] {title}")
-                    ref_count += 1
-                overview.append("")
-
-            # Add entity information with corresponding references
-            if entity_results:
-                overview.append("Topics and concepts found:")
-                for result in entity_results:
-                    entity_info = result['entity_info']
-                    if entity_info['type'] and entity_info['name']:
-                        entity_type = entity_info['type']
-                        name = entity_info['name']
-                        docs = entity_info['documents']
-                        overview.append(f"- {entity_type.title()}: {name}")
-                        if docs:
-                            ref_nums = [f"[{doc_refs[doc]}]" for doc in docs if doc in doc_refs]
-                            if ref_nums:
-                                overview.append(f"  Referenced in: {' '.join(ref_nums)}")
-                overview.append("")
-
-            return "\n".join(overview)
-
+    def _get_graph_overview(self, query_text: str) -> Optional[str]:
+        """Enhanced graph overview with hybrid retrieval"""
+        results, _ = self._try_graph_results(query_text)
+        return self._format_overview(*results) if results else None
+
+    def _try_graph_results(self, query_text: str, query_embedding: Optional[List[float]] = None,
+                           filters: Optional[Dict[str, Any]] = None):
+        """Return the graph rows for a query, or None, and whether fetching them failed"""
+        if not self.graph:
+            return None, False
+        try:
+            return self._get_graph_results(query_text, query_embedding, filters=filters), False
         except Exception as e:
             self.logger.error(f"Error getting graph overview: {str(e)}")
-            return None
\ No newline at end of file
+            return None, True
+
+    def _get_graph_results(self, query_text: str, query_embedding: Optional[List[float]] = None,
+                           top_k: Optional[int] = None, filters: Optional[Dict[str, Any]] = None):
+        """Fetch the entity and document rows matching a query, cached until the graph changes; raises on errors"""
+        if not self.graph:
+            return None
+
+        if top_k is None:
+            top_k = FILTERED_DOCUMENT_VECTOR_TOP_K if filters else DOCUMENT_VECTOR_TOP_K
+        key = (query_text.strip(), top_k, self.graph.write_epoch, _filter_key(filters))
+        now = time.monotonic()
+        with LlamaService._graph_results_cache_lock:
+            entry = LlamaService._graph_results_cache.get(key)
+            if entry is not None and now - entry[0] < GRAPH_RESULTS_CACHE_TTL:
+                LlamaService._graph_results_cache.move_to_end(key)
+                return entry[1]
+
+        results = self._query_graph(query_text, query_embedding, top_k, filters)
+
+        with LlamaService._graph_results_cache_lock:
+            LlamaService._graph_results_cache[key] = (now, results)
+            LlamaService._graph_results_cache.move_to_end(key)
+            while len(LlamaService._graph_results_cache) > GRAPH_RESULTS_CACHE_SIZE:
+                LlamaService._graph_results_cache.popitem(last=False)
+        return results
+
+    def _query_graph(self, query_text: str, query_embedding: Optional[List[float]], top_k: int,
+                     filters: Optional[Dict[str, Any]]):
+        """Run the entity and document queries for a query"""
+        # Extract query entities and keywords using semantic processor
+        semantic_analysis = self._semantic_processor.analyze_query(query_text, query_embedding)
+        query_entities = [entity['text'].lower() for entity in semantic_analysis['entities']]
+
+        # Split query into keywords and remove punctuation, then match them
+        # through the full-text indexes instead of scanning with CONTAINS
+        keywords = [word.strip('?.,!') for word in query_text.lower().split()]
+        search = _fulltext_search(keywords)
+
+        # Run the entity and document queries concurrently; documents start from the
+        # cached keyword matches and reuse the embedding computed by analyze_query
+        filter_params = {name: (filters or {}).get(name) for name in DOCUMENT_FILTERS}
+        entity_future = self._query_pool.submit(self.graph.read_query, ENTITY_QUERY,
+                                                search=search, **filter_params)
+        if self.graph.vector_index_available and top_k > 0:
+            doc_query, vector_params = DOCUMENT_VECTOR_QUERY, {'top_k': top_k}
+        else:
+            doc_query, vector_params = DOCUMENT_QUERY, {}
+        doc_future = self._query_pool.submit(self.graph.read_query, doc_query,
+                                             doc_ids=self._search_document_ids(search),
+                                             entities=query_entities,
+                                             embedding=semantic_analysis['embedding'],
+                                             **vector_params, **filter_params)
+        entity_results = entity_future.result()
+        doc_results = doc_future.result()
+
+        if not entity_results and not doc_results:
+            return None
+        return entity_results, doc_results
+
+    def _direct_answer(self, query_text: str, entity_results: List[Dict],
+                       doc_results: List[Dict]) -> Optional[str]:
+        """Answer a query that is just the name of one entity without the LLM"""
+        if len(doc_results) > 1:
+            return None
+        name = query_text.strip().strip('?.,!').lower()
+        matches = [result['entity_info'] for result in entity_results
+                   if (result['entity_info']['name'] or '').lower() == name]
+        if len(matches) != 1:
+            return None
+        entity_info = matches[0]
+        documents = [doc for doc in entity_info['documents'] if doc]
+        return DIRECT_ANSWER_TEMPLATE.format(name=entity_info['name'],
+                                             type=(entity_info['type'] or 'entity').title(),
+                                             documents=", ".join(documents) or "no documents yet")
+
+    def _format_overview(self, entity_results: List[Dict], doc_results: List[Dict]) -> str:
+        """Format entity and document rows as a numbered reference list"""
+        overview = []
+        ref_count = 1
+        doc_refs = {}
+
+        # Add document information with reference numbers
+        if doc_results:
+            overview.append("Referenced Documents:")
+            for result in doc_results:
+                title = result['doc_info']['title']
+                doc_refs[title] = ref_count
+                overview.append(f"[{ref_count}] {title}")
+                ref_count += 1
+            overview.append("")
+
+        # Add entity information with corresponding references
+        if entity_results:
+            overview.append("Topics and concepts found:")
+            for result in entity_results:
+                entity_info = result['entity_info']
+                if entity_info['type'] and entity_info['name']:
+                    entity_type = entity_info['type']
+                    name = entity_info['name']
+                    docs = entity_info['documents']
+                    overview.append(f"- {entity_type.title()}: {name}")
+                    if docs:
+                        ref_nums = [f"[{doc_refs[doc]}]" for doc in docs if doc in doc_refs]
+                        if ref_nums:
+                            overview.append(f"  Referenced in: {' '.join(ref_nums)}")
+            overview.append("")
+
+        return "\n".join(overview)
\ No newline at end of file
@@ -1,30 +1,71 @@
 import logging
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-import numpy as np
+from nltk.tokenize import sent_tokenize
 from sentence_transformers import SentenceTransformer
-import torch
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import spacy
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Download required NLTK data
-nltk.download('punkt', quiet=True)
+# NLTK tokenizer data required by sent_tokenize
+NLTK_PUNKT_RESOURCES = ('punkt', 'punkt_tab')
+_punkt_available = False
+
+def _ensure_punkt():
+    """Download the NLTK sentence tokenizer data the first time it is needed"""
+    global _punkt_available
+    if _punkt_available:
+        return
+    for resource in NLTK_PUNKT_RESOURCES:
+        try:
+            nltk.data.find(f'tokenizers/{resource}')
+        except LookupError:
+            nltk.download(resource, quiet=True)
+    _punkt_available = True
+
+# spaCy components whose output is never read by the entity extractor
+SPACY_EXCLUDED_PIPES = ("lemmatizer", "attribute_ruler")
+
+@lru_cache(maxsize=1)
+def _load_nlp(exclude: tuple = SPACY_EXCLUDED_PIPES):
+    """Load the spaCy pipeline once per process"""
+    return spacy.load("en_core_web_sm", exclude=list(exclude))
+
+@lru_cache(maxsize=1)
+def _load_sentence_model(model_name: str = 'all-MiniLM-L6-v2') -> SentenceTransformer:
+    """Load the sentence transformer once per process"""
+    return SentenceTransformer(model_name)
+
+# Maximum characters per spaCy chunk so parser memory stays bounded on long documents
+SPACY_CHUNK_SIZE = 8000
+
+# Number of chunks spaCy processes per batch
+SPACY_BATCH_SIZE = 32
+
+# Maximum number of document analyses kept in memory
+ANALYSIS_CACHE_SIZE = 128
 
 class SemanticProcessor:
+    # Document analyses keyed by SHA-256 of their content, shared by all instances
+    _analysis_cache = OrderedDict()
+    _analysis_cache_lock = threading.Lock()
+
     def __init__(self):
         """Initialize the semantic processor with sentence transformers and spaCy"""
         self.logger = logging.getLogger(__name__)
         try:
             # Initialize sentence transformer model
             self.logger.info("Initializing sentence transformer model...")
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self.model = _load_sentence_model('all-MiniLM-L6-v2')
             self.logger.info("Successfully initialized sentence transformer")
             # Initialize spaCy NLP model
             self.logger.info("Initializing spaCy NLP model...")
-            self.nlp = spacy.load("en_core_web_sm")
+            self.nlp = _load_nlp(SPACY_EXCLUDED_PIPES)
             self.logger.info("Successfully initialized spaCy NLP model")
             self.logger.info("Successfully initialized semantic processing")
         except Exception as e:
@@ -43,6 +84,24 @@ class SemanticProcessor:
     def process_document(self, content: str) -> dict:
         """Extract semantic information from document"""
         try:
+            # Nothing to embed or parse for empty or whitespace-only content
+            if not content or not content.strip():
+                return {
+                    "entities": [],
+                    "chunks": [],
+                    "embeddings": []
+                }
+
+            # Reuse the analysis when identical content was processed before
+            content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            with self._analysis_cache_lock:
+                cached = self._analysis_cache.get(content_hash)
+                if cached is not None:
+                    self._analysis_cache.move_to_end(content_hash)
+            if cached is not None:
+                self.logger.debug("Using cached analysis for document content")
+                return cached
+
             # Create document chunks
             chunks = self._create_chunks(content)
 
@@ -58,23 +117,30 @@ class SemanticProcessor:
             # Extract entities using enhanced NLP techniques
             entities = self._extract_entities(content)
 
-            return {
+            result = {
                 "entities": entities,
                 "chunks": chunks,
                 "embeddings": embeddings
             }
 
+            with self._analysis_cache_lock:
+                self._analysis_cache[content_hash] = result
+                if len(self._analysis_cache) > ANALYSIS_CACHE_SIZE:
+                    self._analysis_cache.popitem(last=False)
+
+            return result
+
         except Exception as e:
             self.logger.error(f"Error processing document: {str(e)}")
             raise
 
-    def analyze_query(self, query: str) -> dict:
-        """Analyze query for semantic search"""
+    def analyze_query(self, query: str, embedding: list = None) -> dict:
+        """Analyze query for semantic search, reusing the embedding if already computed"""
         try:
             self.logger.debug(f"Analyzing query: {query}")
 
             # Generate query embedding
-            query_embedding = self.get_text_embedding(query)
+            query_embedding = embedding if embedding is not None else self.get_text_embedding(query)
             self.logger.debug("Generated query embedding successfully")
 
             # Basic query analysis
@@ -95,6 +161,7 @@ class SemanticProcessor:
         """Split text into semantic chunks"""
         try:
             # First split into sentences
+            _ensure_punkt()
             sentences = sent_tokenize(text)
             chunks = []
             current_chunk = []
@@ -122,15 +189,39 @@ class SemanticProcessor:
     def _extract_entities(self, text: str) -> list:
         """Extract entities using enhanced NLP techniques"""
         entities = []
-        doc = self.nlp(text)
-
-        for ent in doc.ents:
-            entities.append({
-                "text": ent.text,
-                "label": ent.label_,
-                "start": ent.start_char,
-                "end": ent.end_char,
-                "context": text[max(0, ent.start_char-50):min(len(text), ent.end_char+50)]
-            })
-
-        return entities
\ No newline at end of file
+        if not text or not text.strip():
+            return entities
+
+        # Parse bounded chunks in batches and shift entity offsets back into the full text
+        docs = self.nlp.pipe(self._split_for_nlp(text), as_tuples=True,
+                             batch_size=SPACY_BATCH_SIZE)
+        for doc, offset in docs:
+            for ent in doc.ents:
+                start = ent.start_char + offset
+                end = ent.end_char + offset
+                entities.append({
+                    "text": ent.text,
+                    "label": ent.label_,
+                    "start": start,
+                    "end": end,
+                    "context": text[max(0, start-50):min(len(text), end+50)]
+                })
+
+        return entities
+
+    def _split_for_nlp(self, text: str) -> List[Tuple[str, int]]:
+        """Split text into chunks of at most SPACY_CHUNK_SIZE paired with their start offset"""
+        chunks = []
+        start = 0
+        while start < len(text):
+            end = min(start + SPACY_CHUNK_SIZE, len(text))
+            if end < len(text):
+                # Prefer breaking at a paragraph, then at a space
+                split_at = text.rfind('\n\n', start, end)
+                if split_at <= start:
+                    split_at = text.rfind(' ', start, end)
+                if split_at > start:
+                    end = split_at
+            chunks.append((text[start:end], start))
+            start = end
+        return chunks
\ No newline at end of file
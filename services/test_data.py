@@ -1,5 +1,5 @@
 
-from services.graph_service import GraphService
+from services.graph_service import get_graph_service
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,11 +7,10 @@ logger = logging.getLogger(__name__)
 def setup_test_data():
     """Create test nodes and relationships for testing GraphRAG improvements"""
     try:
-        from services.graph_service import GraphService
         from services.document_processor import DocumentProcessor
         from services.semantic_processor import SemanticProcessor
 
-        graph = GraphService()
+        graph = get_graph_service()
         semantic_processor = SemanticProcessor()
         doc_processor = DocumentProcessor(graph, semantic_processor)
         
@@ -39,16 +38,16 @@ def setup_test_data():
                 logger.info(f"Generated embedding of length: {len(doc['embedding'])}")
                 
                 # Create document node with embedding
-                doc_node = graph.create_document_node(doc)
-                logger.info(f"Created document node: {doc_node}")
+                doc_id = graph.create_document_node(doc)
+                logger.info(f"Created document node: {doc_id}")
                 
                 # Extract and create entities
                 entities = doc_processor._extract_entities(doc['content'])
                 logger.info(f"Extracted {len(entities)} entities")
                 
-                for entity in entities:
-                    entity_node = graph.create_entity_node(entity, doc_node)
-                    logger.info(f"Created entity node: {entity['name']} ({entity['type']})")
+                # Create all entity nodes for the document in one batch
+                graph.create_entity_nodes_bulk(entities, doc_id)
+                logger.info(f"Created {len(entities)} entity nodes")
             except Exception as e:
                 logger.error(f"Error processing document {doc['title']}: {str(e)}")
                 raise
@@ -57,10 +56,10 @@ def setup_test_data():
         return True
         
         # Create document nodes
-        doc_nodes = []
+        doc_ids = []
         for doc in docs:
             node = graph.create_document_node(doc)
-            doc_nodes.append(node)
+            doc_ids.append(node)
             
         # Create entity nodes with relationships
         entities = [
@@ -70,9 +69,8 @@ def setup_test_data():
             {'name': 'range of motion', 'type': 'Metric'}
         ]
         
-        for doc_node in doc_nodes:
-            for entity in entities:
-                graph.create_entity_node(entity, doc_node)
+        for doc_id in doc_ids:
+            graph.create_entity_nodes_bulk(entities, doc_id)
                 
         logger.info("Test data setup complete")
         return True
@@ -19,7 +19,22 @@ function updateGraph() {
 
     // Fetch and render graph data
     fetch('/graph')
-        .then(response => response.json())
+        .then(response => response.text())
+        .then(text => {
+            // Each NDJSON line holds either a node or a link
+            const graph = {nodes: [], links: []};
+            text.split("\n").forEach(line => {
+                if (!line) return;
+                const item = JSON.parse(line);
+                if (item.node) graph.nodes.push(item.node);
+                else if (item.link) graph.links.push(item.link);
+            });
+
+            // Drop links to nodes written after the node scan
+            const nodeIds = new Set(graph.nodes.map(n => n.id));
+            graph.links = graph.links.filter(l => nodeIds.has(l.source) && nodeIds.has(l.target));
+            return graph;
+        })
         .then(graph => {
             // Create links
             const link = svg.append("g")
@@ -0,0 +1,104 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.llama_service import LlamaService, STREAM_ERROR_RESPONSE
+
+QUERY = "How do I improve my jump serve?"
+
+
+def _answer(text):
+    """Build a fake Anthropic messages.create response"""
+    response = MagicMock()
+    response.content = [MagicMock(text=text)]
+    return response
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """LlamaService wired to a mocked Anthropic client, semantic processor and graph"""
+    monkeypatch.delenv('ANTHROPIC_API_KEY', raising=False)
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    for cache in (LlamaService._result_cache, LlamaService._response_cache,
+                  LlamaService._graph_results_cache, LlamaService._search_cache):
+        cache.clear()
+
+    llama_service = LlamaService()
+    llama_service._anthropic = MagicMock()
+    llama_service._anthropic.messages.create.return_value = _answer("Toss higher.")
+
+    llama_service._semantic_processor = MagicMock()
+    llama_service._semantic_processor.get_text_embedding.return_value = [1.0, 0.0, 0.0]
+    llama_service._semantic_processor.analyze_query.return_value = {
+        'entities': [], 'embedding': [1.0, 0.0, 0.0]
+    }
+
+    llama_service._graph = MagicMock(write_epoch=0, vector_index_available=False)
+    llama_service._graph.read_query.return_value = []
+    return llama_service
+
+
+def test_successful_result_is_cached(service):
+    first = service.process_query(QUERY)
+    second = service.process_query(QUERY)
+
+    assert first['response'] == "Toss higher."
+    assert second == first
+    assert service._anthropic.messages.create.call_count == 1
+
+
+def test_write_epoch_invalidates_cached_result(service):
+    service.process_query(QUERY)
+    graph_reads = service._graph.read_query.call_count
+    service.process_query(QUERY)
+    assert service._graph.read_query.call_count == graph_reads
+
+    # A graph write moves the epoch, so the graph is queried again
+    service._graph.write_epoch = 1
+    service.process_query(QUERY)
+    assert service._graph.read_query.call_count > graph_reads
+
+
+def test_llm_failure_is_not_cached(service):
+    service._anthropic.messages.create.side_effect = RuntimeError("overloaded")
+
+    failed = service.process_query(QUERY)
+    assert "error" in failed['response']
+    assert not LlamaService._result_cache
+    assert not LlamaService._response_cache
+
+    # The next call reaches the LLM again instead of replaying the error
+    service._anthropic.messages.create.side_effect = None
+    assert service.process_query(QUERY)['response'] == "Toss higher."
+
+
+def test_graph_failure_is_not_cached(service):
+    service._graph.read_query.side_effect = RuntimeError("connection reset")
+
+    result = service.process_query(QUERY)
+
+    # The query is still answered, without graph context, but not reused
+    assert result['response'] == "Toss higher."
+    assert not LlamaService._result_cache
+    assert not LlamaService._graph_results_cache
+
+
+def test_stream_failure_is_not_cached(service):
+    service._anthropic.messages.stream.side_effect = RuntimeError("overloaded")
+
+    streamed = "".join(service.stream_query(QUERY))
+
+    assert streamed.endswith(STREAM_ERROR_RESPONSE)
+    assert not LlamaService._result_cache
+    assert not LlamaService._response_cache
+
+
+def test_streamed_result_is_cached(service):
+    stream = service._anthropic.messages.stream.return_value.__enter__.return_value
+    stream.text_stream = iter(["Toss ", "higher."])
+
+    assert "".join(service.stream_query(QUERY)) == "Toss higher."
+
+    # A repeat comes back whole from the result cache, without another stream
+    assert "".join(service.stream_query(QUERY)) == "Toss higher."
+    assert service._anthropic.messages.stream.call_count == 1
@@ -0,0 +1,112 @@
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from app import app, validate_filters
+from services.graph_service import GraphService
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    with app.test_client() as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def llama_service(monkeypatch):
+    """Stand-in LlamaService registered with the app"""
+    fake = MagicMock()
+    fake.process_query.return_value = {
+        'response': "Toss higher.",
+        'technical_details': {'queries': {'graph_context': None}}
+    }
+    fake.stream_query.side_effect = lambda query, filters=None: iter(["Toss ", "higher."])
+    monkeypatch.setitem(app.config, 'llama_service', fake)
+    return fake
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'titles': ['Serve drills.txt']},
+    {'since': '2025-01-01', 'until': '2025-02-01T12:30:00'},
+])
+def test_validate_filters_accepts(filters):
+    assert validate_filters(filters) is None
+
+
+@pytest.mark.parametrize('filters, error', [
+    ([], 'Filters must be an object'),
+    ({'author': 'me'}, 'Unknown filters: author'),
+    ({'titles': 'Serve drills.txt'}, 'titles must be a list of strings'),
+    ({'titles': [1]}, 'titles must be a list of strings'),
+    ({'since': 'last week'}, 'since must be an ISO 8601 timestamp'),
+    ({'until': 20250101}, 'until must be an ISO 8601 timestamp'),
+])
+def test_validate_filters_rejects(filters, error):
+    assert validate_filters(filters) == error
+
+
+@pytest.mark.parametrize('path', ['/query', '/query/stream'])
+def test_query_routes_reject_invalid_requests(client, llama_service, path):
+    assert client.post(path, data='serve', content_type='text/plain').status_code == 400
+    assert client.post(path, json=['serve']).status_code == 400
+    assert client.post(path, json={'query': ''}).status_code == 400
+
+    response = client.post(path, json={'query': 'serve', 'filters': {'titles': 'a'}})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'titles must be a list of strings'
+
+    llama_service.process_query.assert_not_called()
+    llama_service.stream_query.assert_not_called()
+
+
+def test_query_passes_filters(client, llama_service):
+    filters = {'titles': ['Serve drills.txt'], 'since': '2025-01-01'}
+    response = client.post('/query', json={'query': 'serve', 'filters': filters})
+
+    assert response.status_code == 200
+    assert response.get_json()['response'] == "Toss higher."
+    llama_service.process_query.assert_called_once_with('serve', filters=filters)
+
+
+def test_query_stream_returns_text(client, llama_service):
+    response = client.post('/query/stream', json={'query': 'serve'})
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert response.get_data(as_text=True) == "Toss higher."
+    llama_service.stream_query.assert_called_once_with('serve', filters=None)
+
+
+def test_query_stream_unavailable(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'llama_service', None)
+    assert client.post('/query/stream', json={'query': 'serve'}).status_code == 503
+
+
+def test_graph_streams_ndjson(client, monkeypatch):
+    monkeypatch.setattr(GraphService, '_parallel_runtime', False)
+    graph_service = GraphService.__new__(GraphService)
+    graph_service.logger = MagicMock()
+    graph_service.driver = MagicMock()
+    session = graph_service.driver.session.return_value.__enter__.return_value
+    session.run.side_effect = [
+        [{'id': 1, 'label': 'Document', 'properties': {'title': 'Serve drills.txt'}},
+         {'id': 2, 'label': 'Skill', 'properties': {'name': 'Jump serve'}}],
+        [{'source': 1, 'target': 2, 'type': 'CONTAINS'}],
+    ]
+    monkeypatch.setitem(app.config, 'graph_db', graph_service)
+
+    response = client.get('/graph')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['node']['id'] for line in lines[:2]] == [1, 2]
+    assert lines[2] == {'link': {'source': 1, 'target': 2, 'type': 'CONTAINS'}}
+
+
+def test_graph_unavailable(client, monkeypatch):
+    monkeypatch.setitem(app.config, 'graph_db', None)
+    assert client.get('/graph').status_code == 503